@@ -17,12 +17,21 @@ down_revision: Union[str, None] = None
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
+INDEX_STATEMENTS = [
+    "ix_documents_workspace_id ON documents (workspace_id)",
+    "ix_documents_document_type ON documents (document_type)",
+    "ix_matching_results_workspace_id ON matching_results (workspace_id)",
+    "ix_matching_results_total_difference ON matching_results (total_difference)",
+    "ix_documents_pending ON documents (created_at) WHERE status IN ('uploaded', 'processing')",
+    "ix_matching_discrepancies_gin ON matching_results USING GIN (discrepancies jsonb_path_ops)",
+]
+
 
 def upgrade() -> None:
     # Create workspaces table
     op.create_table(
         'workspaces',
-        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
         sa.Column('name', sa.String(), nullable=False),
         sa.Column('is_temporary', sa.Boolean(), nullable=True, server_default='true'),
         sa.Column('created_at', sa.DateTime(), nullable=True),
@@ -33,10 +42,10 @@ def upgrade() -> None:
     # Create documents table
     op.create_table(
         'documents',
-        sa.Column('id', sa.String(), nullable=False),
-        sa.Column('workspace_id', sa.String(), nullable=False),
-        sa.Column('document_type', sa.Enum('PURCHASE_ORDER', 'INVOICE', 'DELIVERY_NOTE', name='documenttype'), nullable=False),
-        sa.Column('status', sa.Enum('UPLOADED', 'PROCESSING', 'PROCESSED', 'FAILED', name='documentstatus'), nullable=True, server_default='UPLOADED'),
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('workspace_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('document_type', sa.String(32), nullable=False),
+        sa.Column('status', sa.String(32), nullable=True, server_default='uploaded'),
         sa.Column('file_name', sa.String(), nullable=False),
         sa.Column('file_path', sa.String(), nullable=False),
         sa.Column('file_size', sa.Integer(), nullable=False),
@@ -44,14 +53,16 @@ def upgrade() -> None:
         sa.Column('created_at', sa.DateTime(), nullable=True),
         sa.Column('updated_at', sa.DateTime(), nullable=True),
         sa.ForeignKeyConstraint(['workspace_id'], ['workspaces.id'], ondelete='CASCADE'),
-        sa.PrimaryKeyConstraint('id')
+        sa.PrimaryKeyConstraint('id'),
+        sa.CheckConstraint("document_type IN ('purchase_order', 'invoice', 'delivery_note')", name='ck_document_type'),
+        sa.CheckConstraint("status IN ('uploaded', 'processing', 'processed', 'failed')", name='ck_document_status')
     )
 
     # Create extracted_data table
     op.create_table(
         'extracted_data',
-        sa.Column('id', sa.String(), nullable=False),
-        sa.Column('document_id', sa.String(), nullable=False),
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('document_id', postgresql.UUID(as_uuid=True), nullable=False),
         sa.Column('po_number', sa.String(), nullable=True),
         sa.Column('invoice_number', sa.String(), nullable=True),
         sa.Column('delivery_note_number', sa.String(), nullable=True),
@@ -59,8 +70,8 @@ def upgrade() -> None:
         sa.Column('vendor_address', sa.String(), nullable=True),
         sa.Column('date', sa.DateTime(), nullable=True),
         sa.Column('total_amount', sa.Numeric(precision=10, scale=2), nullable=True),
-        sa.Column('line_items', postgresql.JSON(astext_type=sa.Text()), nullable=True),
-        sa.Column('confidence_scores', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+        sa.Column('line_items', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('confidence_scores', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
         sa.Column('extraction_model', sa.String(), nullable=True),
         sa.Column('created_at', sa.DateTime(), nullable=True),
         sa.Column('updated_at', sa.DateTime(), nullable=True),
@@ -72,18 +83,18 @@ def upgrade() -> None:
     # Create matching_results table
     op.create_table(
         'matching_results',
-        sa.Column('id', sa.String(), nullable=False),
-        sa.Column('workspace_id', sa.String(), nullable=False),
-        sa.Column('po_document_id', sa.String(), nullable=True),
-        sa.Column('invoice_document_id', sa.String(), nullable=True),
-        sa.Column('delivery_note_document_id', sa.String(), nullable=True),
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('workspace_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('po_document_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('invoice_document_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('delivery_note_document_id', postgresql.UUID(as_uuid=True), nullable=True),
         sa.Column('match_confidence', sa.String(), nullable=True),
         sa.Column('matched_by', sa.String(), nullable=True),
-        sa.Column('total_po_amount', sa.String(), nullable=True),
-        sa.Column('total_invoice_amount', sa.String(), nullable=True),
-        sa.Column('total_delivery_amount', sa.String(), nullable=True),
-        sa.Column('total_difference', sa.String(), nullable=True),
-        sa.Column('discrepancies', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+        sa.Column('total_po_amount', sa.Numeric(precision=14, scale=2), nullable=True),
+        sa.Column('total_invoice_amount', sa.Numeric(precision=14, scale=2), nullable=True),
+        sa.Column('total_delivery_amount', sa.Numeric(precision=14, scale=2), nullable=True),
+        sa.Column('total_difference', sa.Numeric(precision=14, scale=2), nullable=True),
+        sa.Column('discrepancies', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
         sa.Column('created_at', sa.DateTime(), nullable=True),
         sa.Column('updated_at', sa.DateTime(), nullable=True),
         sa.ForeignKeyConstraint(['workspace_id'], ['workspaces.id'], ondelete='CASCADE'),
@@ -93,20 +104,20 @@ def upgrade() -> None:
         sa.PrimaryKeyConstraint('id')
     )
 
-    # Create indexes
-    op.create_index('ix_documents_workspace_id', 'documents', ['workspace_id'])
-    op.create_index('ix_documents_document_type', 'documents', ['document_type'])
-    op.create_index('ix_matching_results_workspace_id', 'matching_results', ['workspace_id'])
-
+    # Build indexes CONCURRENTLY so online deploys don't block writers. CONCURRENTLY can't run
+    # inside a transaction (or a multi-statement string), so each one is its own statement in an
+    # autocommit block; IF NOT EXISTS keeps re-runs idempotent.
+    # ix_documents_pending is partial and stays small because finished documents are excluded.
+    with op.get_context().autocommit_block():
+        for statement in INDEX_STATEMENTS:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {statement}")
 
 def downgrade() -> None:
-    op.drop_index('ix_matching_results_workspace_id', table_name='matching_results')
-    op.drop_index('ix_documents_document_type', table_name='documents')
-    op.drop_index('ix_documents_workspace_id', table_name='documents')
+    with op.get_context().autocommit_block():
+        for statement in reversed(INDEX_STATEMENTS):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {statement.split()[0]}")
     op.drop_table('matching_results')
     op.drop_table('extracted_data')
     op.drop_table('documents')
     op.drop_table('workspaces')
-    op.execute('DROP TYPE IF EXISTS documentstatus')
-    op.execute('DROP TYPE IF EXISTS documenttype')
 
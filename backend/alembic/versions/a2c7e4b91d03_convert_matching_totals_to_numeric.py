@@ -0,0 +1,47 @@
+"""convert matching totals to numeric
+
+Revision ID: a2c7e4b91d03
+Revises: e5b1c8d07f42
+Create Date: 2026-01-22
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2c7e4b91d03'
+down_revision: Union[str, None] = 'e5b1c8d07f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TOTAL_COLUMNS = ['total_po_amount', 'total_invoice_amount', 'total_delivery_amount', 'total_difference']
+
+
+def upgrade() -> None:
+    # Databases created before 001_initial used numeric totals store them as strings
+    # (str() of a float, or "None"). Convert them in place; values that are not numbers
+    # become NULL. Columns that are already numeric are left untouched.
+    for column in TOTAL_COLUMNS:
+        op.execute(f"""
+            DO $$
+            BEGIN
+                IF (SELECT data_type FROM information_schema.columns
+                    WHERE table_name = 'matching_results' AND column_name = '{column}') = 'character varying' THEN
+                    ALTER TABLE matching_results ALTER COLUMN {column} TYPE numeric(14, 2)
+                        USING CASE WHEN {column} ~ '^\\s*-?[0-9]+(\\.[0-9]+)?\\s*$'
+                                   THEN {column}::numeric END;
+                END IF;
+            END $$;
+        """)
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_matching_results_total_difference "
+            "ON matching_results (total_difference)"
+        )
+
+
+def downgrade() -> None:
+    # numeric is the type 001_initial creates, so there is nothing to revert
+    pass
@@ -0,0 +1,38 @@
+"""index matching document foreign keys
+
+Revision ID: b5d1f8a36c27
+Revises: a2c7e4b91d03
+Create Date: 2026-01-22
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d1f8a36c27'
+down_revision: Union[str, None] = 'a2c7e4b91d03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_STATEMENTS = [
+    "ix_matching_results_po_document_id ON matching_results (po_document_id)",
+    "ix_matching_results_invoice_document_id ON matching_results (invoice_document_id)",
+    "ix_matching_results_delivery_note_document_id ON matching_results (delivery_note_document_id)",
+    "ix_matching_results_ws_po ON matching_results (workspace_id, po_document_id)",
+]
+
+
+def upgrade() -> None:
+    # Postgres does not index FK referencing columns automatically, and every DELETE on
+    # documents has to find matching_results rows to SET NULL
+    with op.get_context().autocommit_block():
+        for statement in INDEX_STATEMENTS:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {statement}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for statement in reversed(INDEX_STATEMENTS):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {statement.split()[0]}")
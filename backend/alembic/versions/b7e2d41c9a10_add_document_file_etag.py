@@ -0,0 +1,27 @@
+"""add document file etag
+
+Revision ID: b7e2d41c9a10
+Revises: af5c77765af1
+Create Date: 2026-01-12
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2d41c9a10'
+down_revision: Union[str, None] = 'af5c77765af1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Storage ETag of the uploaded file, used for conditional downloads
+    op.add_column('documents', sa.Column('file_etag', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('documents', 'file_etag')
@@ -0,0 +1,67 @@
+"""convert text ids to uuid
+
+Revision ID: c41e9f7a2d35
+Revises: b7e2d41c9a10
+Create Date: 2026-01-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e9f7a2d35'
+down_revision: Union[str, None] = 'b7e2d41c9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, referenced table, ON DELETE action)
+FOREIGN_KEYS = [
+    ('documents', 'workspace_id', 'workspaces', 'CASCADE'),
+    ('extracted_data', 'document_id', 'documents', 'CASCADE'),
+    ('matching_results', 'workspace_id', 'workspaces', 'CASCADE'),
+    ('matching_results', 'po_document_id', 'documents', 'SET NULL'),
+    ('matching_results', 'invoice_document_id', 'documents', 'SET NULL'),
+    ('matching_results', 'delivery_note_document_id', 'documents', 'SET NULL'),
+]
+PRIMARY_KEYS = ['workspaces', 'documents', 'extracted_data', 'matching_results']
+
+
+def upgrade() -> None:
+    # Databases created before 001_initial used uuid columns still store ids as text.
+    # Convert them in place; a database that already has uuid columns is left untouched.
+    drop_fks = "\n".join(
+        f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_{column}_fkey;"
+        for table, column, _, _ in FOREIGN_KEYS
+    )
+    alter_pks = "\n".join(
+        f"ALTER TABLE {table} ALTER COLUMN id TYPE uuid USING id::uuid;"
+        for table in PRIMARY_KEYS
+    )
+    alter_fks = "\n".join(
+        f"ALTER TABLE {table} ALTER COLUMN {column} TYPE uuid USING {column}::uuid;"
+        for table, column, _, _ in FOREIGN_KEYS
+    )
+    add_fks = "\n".join(
+        f"ALTER TABLE {table} ADD CONSTRAINT {table}_{column}_fkey FOREIGN KEY ({column}) "
+        f"REFERENCES {referenced}(id) ON DELETE {action};"
+        for table, column, referenced, action in FOREIGN_KEYS
+    )
+    op.execute(f"""
+        DO $$
+        BEGIN
+            IF (SELECT data_type FROM information_schema.columns
+                WHERE table_name = 'workspaces' AND column_name = 'id') <> 'uuid' THEN
+                {drop_fks}
+                {alter_pks}
+                {alter_fks}
+                {add_fks}
+            END IF;
+        END $$;
+    """)
+
+
+def downgrade() -> None:
+    # uuid is the type 001_initial creates, so there is nothing to revert
+    pass
@@ -0,0 +1,45 @@
+"""add document check constraints
+
+Revision ID: c9e2a7d45f18
+Revises: b5d1f8a36c27
+Create Date: 2026-01-22
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e2a7d45f18'
+down_revision: Union[str, None] = 'b5d1f8a36c27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CHECK_CONSTRAINTS = [
+    ("documents", "ck_documents_file_size_pos", "file_size > 0"),
+    ("documents", "ck_documents_page_count_pos", "page_count IS NULL OR page_count > 0"),
+    ("extracted_data", "ck_extracted_total_amount_nonneg", "total_amount IS NULL OR total_amount >= 0"),
+]
+
+
+def upgrade() -> None:
+    # NOT VALID skips the full-table scan under the ACCESS EXCLUSIVE lock; existing rows are
+    # checked afterwards by VALIDATE CONSTRAINT, which only blocks schema changes
+    for table, name, condition in CHECK_CONSTRAINTS:
+        op.execute(f"""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = '{name}') THEN
+                    ALTER TABLE {table} ADD CONSTRAINT {name} CHECK ({condition}) NOT VALID;
+                END IF;
+            END $$;
+        """)
+    with op.get_context().autocommit_block():
+        for table, name, _ in CHECK_CONSTRAINTS:
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+
+
+def downgrade() -> None:
+    for table, name, _ in reversed(CHECK_CONSTRAINTS):
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {name}")
@@ -0,0 +1,35 @@
+"""add document content hash
+
+Revision ID: d4f7b2e96a31
+Revises: c9e2a7d45f18
+Create Date: 2026-01-23
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f7b2e96a31'
+down_revision: Union[str, None] = 'c9e2a7d45f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SHA-256 of the uploaded file, to look up earlier extractions of a re-uploaded file;
+    # only processed documents can be reused, so the index is partial
+    op.add_column('documents', sa.Column('content_hash', sa.String(64), nullable=True))
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_workspace_content_hash "
+            "ON documents (workspace_id, content_hash) WHERE status = 'processed'"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_workspace_content_hash")
+    op.drop_column('documents', 'content_hash')
@@ -0,0 +1,50 @@
+"""store document type and status as checked strings
+
+Revision ID: d8a3f52b6e14
+Revises: c41e9f7a2d35
+Create Date: 2026-01-20
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a3f52b6e14'
+down_revision: Union[str, None] = 'c41e9f7a2d35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Older databases store the enum member names in native documenttype/documentstatus
+    # types. Convert them to the lowercase values the models now write; a database
+    # created with string columns is left untouched.
+    op.execute("""
+        DO $$
+        BEGIN
+            IF (SELECT data_type FROM information_schema.columns
+                WHERE table_name = 'documents' AND column_name = 'status') = 'USER-DEFINED' THEN
+                DROP INDEX IF EXISTS ix_documents_pending;
+                ALTER TABLE documents ALTER COLUMN status DROP DEFAULT;
+                ALTER TABLE documents
+                    ALTER COLUMN document_type TYPE varchar(32) USING lower(document_type::text),
+                    ALTER COLUMN status TYPE varchar(32) USING lower(status::text);
+                ALTER TABLE documents ALTER COLUMN status SET DEFAULT 'uploaded';
+                ALTER TABLE documents ADD CONSTRAINT ck_document_type
+                    CHECK (document_type IN ('purchase_order', 'invoice', 'delivery_note'));
+                ALTER TABLE documents ADD CONSTRAINT ck_document_status
+                    CHECK (status IN ('uploaded', 'processing', 'processed', 'failed'));
+                CREATE INDEX ix_documents_pending ON documents (created_at)
+                    WHERE status IN ('uploaded', 'processing');
+                DROP TYPE IF EXISTS documenttype;
+                DROP TYPE IF EXISTS documentstatus;
+            END IF;
+        END $$;
+    """)
+
+
+def downgrade() -> None:
+    # checked strings are what 001_initial creates, so there is nothing to revert
+    pass
@@ -0,0 +1,48 @@
+"""convert json columns to jsonb
+
+Revision ID: e5b1c8d07f42
+Revises: d8a3f52b6e14
+Create Date: 2026-01-20
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b1c8d07f42'
+down_revision: Union[str, None] = 'd8a3f52b6e14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column)
+JSON_COLUMNS = [
+    ('extracted_data', 'line_items'),
+    ('extracted_data', 'confidence_scores'),
+    ('matching_results', 'discrepancies'),
+]
+
+
+def upgrade() -> None:
+    # Databases created before 001_initial used jsonb still store these columns as json.
+    # Convert each one in place; columns that are already jsonb are left untouched.
+    for table, column in JSON_COLUMNS:
+        op.execute(f"""
+            DO $$
+            BEGIN
+                IF (SELECT data_type FROM information_schema.columns
+                    WHERE table_name = '{table}' AND column_name = '{column}') = 'json' THEN
+                    ALTER TABLE {table} ALTER COLUMN {column} TYPE jsonb USING {column}::jsonb;
+                END IF;
+            END $$;
+        """)
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_matching_discrepancies_gin "
+        "ON matching_results USING GIN (discrepancies jsonb_path_ops)"
+    )
+
+
+def downgrade() -> None:
+    # jsonb is the type 001_initial creates, so there is nothing to revert
+    pass
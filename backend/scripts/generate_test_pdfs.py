@@ -4,6 +4,11 @@ All documents are 1 page long and test all analysis features.
 Files are prefixed with enterprise name and total less than 10 files.
 """
 from pathlib import Path
+import functools
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -12,340 +17,258 @@ from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib.enums import TA_LEFT, TA_RIGHT
 
-# Create realistic test sets directory
-# Assets is mounted at /app/assets in Docker (from docker-compose.yml)
-import os
-if os.path.exists("/app") and os.path.isdir("/app"):
-    # Docker environment
-    ASSETS_DIR = Path("/app") / "assets" / "test-sets"
-else:
-    # Local environment
-    script_dir = Path(__file__).parent  # scripts/
-    backend_dir = script_dir.parent     # backend/
-    project_root = backend_dir.parent  # project root
-    ASSETS_DIR = project_root / "assets" / "test-sets"
-
-# Create directory, handling case where parent might be a file
-try:
-    ASSETS_DIR.mkdir(parents=True, exist_ok=True)
-except (FileExistsError, PermissionError) as e:
-    # If assets is a file, create in a different location
-    if os.path.exists("/app"):
-        ASSETS_DIR = Path("/app") / "test-sets"
-        ASSETS_DIR.mkdir(parents=True, exist_ok=True)
-    else:
-        raise
-
 
-def generate_invoice(
-    invoice_number: str, po_number: str, vendor: str, output_path: Path,
-    items: list, currency_code: str = "USD", tax_rate: float = 0.08
-):
-    """Generate invoice with specific currency and tax rate."""
-    doc = SimpleDocTemplate(str(output_path), pagesize=letter)
+# Styles and lookup tables are identical for every document, so build them once
+_STYLES = getSampleStyleSheet()
+
+_TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_STYLES['Heading1'],
+    fontSize=24,
+    textColor=colors.HexColor('#1a1a1a'),
+    spaceAfter=30,
+)
+
+_AMOUNT_DUE_STYLE = ParagraphStyle(
+    'AmountDue',
+    parent=_STYLES['Normal'],
+    fontSize=14,
+    fontName='Helvetica-Bold',
+    alignment=2,  # Right align
+    textColor=colors.HexColor('#1a1a1a'),
+)
+
+CURRENCY_SYMBOLS = {
+    "USD": "$",
+    "EUR": "€",
+    "GBP": "£",
+    "JPY": "¥",
+    "CAD": "C$",
+    "AUD": "A$",
+}
+_get_symbol = CURRENCY_SYMBOLS.get
+
+_SUFFIX = re.compile(r'\s+(Inc|Ltd|Co|Corp|Corporation)$')
+# Unicode-aware like str.isalnum(), so accented names keep their letters
+_NONALNUM = re.compile(r'[\W_]+')
+
+_HEADER_TSTYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('TEXTCOLOR', (0, 0), (0, -1), colors.grey),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+])
+
+_ITEMS_TSTYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4a5568')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 11),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('ALIGN', (2, 1), (4, -1), 'RIGHT'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1),
+     [colors.white, colors.HexColor('#f7fafc')]),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+])
+
+_VENDOR_TSTYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('TEXTCOLOR', (0, 0), (0, -1), colors.grey),
+    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+    ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+])
+
+_TOTALS_TSTYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, -1), (-1, -1), 12),
+    ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+    ('TEXTCOLOR', (0, -1), (-1, -1), colors.HexColor('#1a1a1a')),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+])
+
+_CONTAINER_TSTYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+])
+
+_DN_ITEMS_TSTYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4a5568')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 11),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('ALIGN', (2, 1), (2, -1), 'RIGHT'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1),
+     [colors.white, colors.HexColor('#f7fafc')]),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+])
+
+
+def _write_pdf(story: list, output_path: Path):
+    """Render a story in memory and write the PDF with one contiguous write."""
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=letter).build(story)
+    output_path.write_bytes(buffer.getvalue())
+
+
+@functools.lru_cache(maxsize=32)
+def _make_items_rows(items_key: tuple, symbol: str):
+    """Format the priced item rows and their subtotal (accumulated in the same pass)."""
+    rows = [('Item #', 'Description', 'Qty', 'Unit Price', 'Total')]
+    append = rows.append
+    fmt = (symbol + "%.2f").__mod__
+    subtotal = 0.0
+    for item_num, description, qty, price, line_total in items_key:
+        subtotal += line_total
+        append((item_num, description, str(qty), fmt(price), fmt(line_total)))
+    return tuple(rows), subtotal
+
+
+def _build_common(
+    title: str, header_rows: list, vendor_rows: list, items: list, symbol: str,
+    tax_rate: float, totals_label: str, extra_amount_due: bool
+) -> list:
+    """Build the story shared by invoices and POs: header, parties, items, totals."""
     story = []
-    styles = getSampleStyleSheet()
-
-    # Currency symbol mapping
-    currency_symbols = {
-        "USD": "$",
-        "EUR": "€",
-        "GBP": "£",
-        "JPY": "¥",
-        "CAD": "C$",
-        "AUD": "A$",
-    }
-    symbol = currency_symbols.get(currency_code, currency_code)
 
     # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#1a1a1a'),
-        spaceAfter=30,
-    )
-    story.append(Paragraph("INVOICE", title_style))
+    story.append(Paragraph(title, _TITLE_STYLE))
     story.append(Spacer(1, 0.2*inch))
 
     # Header info
-    header_data = [
-        ['Invoice Number:', invoice_number, 'Date:',
-            datetime.now().strftime('%Y-%m-%d')],
-        ['PO Number:', po_number, 'Due Date:',
-            (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')],
-        ['Currency:', currency_code, 'Payment Terms:', 'Net 30'],
-    ]
-    header_table = Table(header_data, colWidths=[
+    header_table = Table(header_rows, colWidths=[
                          1.5*inch, 2*inch, 1.5*inch, 2*inch])
-    header_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.grey),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-    ]))
+    header_table.setStyle(_HEADER_TSTYLE)
     story.append(header_table)
     story.append(Spacer(1, 0.3*inch))
 
-    # Vendor and Bill To
-    from_para = Paragraph(
-        f'<b>{vendor}</b><br/>123 Business St<br/>New York, NY 10001<br/>USA',
-        styles['Normal']
-    )
-    bill_to_para = Paragraph(
-        '<b>ACME Corporation</b><br/>456 Customer Ave<br/>Los Angeles, CA 90001<br/>USA',
-        styles['Normal']
-    )
-    vendor_data = [
-        ['From:', from_para],
-        ['Bill To:', bill_to_para],
-    ]
-    vendor_table = Table(vendor_data, colWidths=[1*inch, 6*inch])
-    vendor_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.grey),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-    ]))
+    # Parties
+    vendor_table = Table(vendor_rows, colWidths=[1*inch, 6*inch])
+    vendor_table.setStyle(_VENDOR_TSTYLE)
     story.append(vendor_table)
     story.append(Spacer(1, 0.3*inch))
 
-    # Line items
-    table_data = [['Item #', 'Description', 'Qty', 'Unit Price', 'Total']]
-    for item in items:
-        table_data.append([
-            item['item_num'],
-            item['description'],
-            str(item['qty']),
-            f"{symbol}{item['price']:.2f}",
-            f"{symbol}{item['total']:.2f}",
-        ])
-
-    items_table = Table(table_data, colWidths=[
+    # Line items (a PO and its invoice share the same rows, so the formatted rows are cached;
+    # flowables are mutated during layout, so each story gets a fresh Table)
+    items_key = tuple(
+        (item['item_num'], item['description'], item['qty'], item['price'], item['total'])
+        for item in items
+    )
+    items_rows, subtotal = _make_items_rows(items_key, symbol)
+    items_table = Table([list(row) for row in items_rows], colWidths=[
                         0.8*inch, 3*inch, 0.8*inch, 1.2*inch, 1.2*inch])
-    items_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4a5568')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('ALIGN', (2, 1), (4, -1), 'RIGHT'),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1),
-         [colors.white, colors.HexColor('#f7fafc')]),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-    ]))
+    items_table.setStyle(_ITEMS_TSTYLE)
     story.append(items_table)
     story.append(Spacer(1, 0.3*inch))
 
     # Totals
-    subtotal = sum(item['total'] for item in items)
     tax = subtotal * tax_rate
     final_total = subtotal + tax
+    money = (symbol + "{:,.2f}").format
 
     totals_data = [
-        ['Subtotal:', f'{symbol}{subtotal:,.2f}'],
-        [f'Tax ({tax_rate*100:.0f}%):', f'{symbol}{tax:,.2f}'],
-        ['Amount Due:', f'{symbol}{final_total:,.2f}'],
+        ['Subtotal:', money(subtotal)],
+        [f'Tax ({tax_rate*100:.0f}%):', money(tax)],
+        [totals_label, money(final_total)],
     ]
     totals_table = Table(totals_data, colWidths=[1*inch, 1.5*inch])
-    totals_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, -1), (-1, -1), 12),
-        ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-        ('TEXTCOLOR', (0, -1), (-1, -1), colors.HexColor('#1a1a1a')),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-    ]))
+    totals_table.setStyle(_TOTALS_TSTYLE)
     container_table = Table([[totals_table]], colWidths=[7*inch])
-    container_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
+    container_table.setStyle(_CONTAINER_TSTYLE)
     story.append(container_table)
 
-    # Add Amount Due as standalone text for better Azure recognition
-    story.append(Spacer(1, 0.1*inch))
-    amount_due_style = ParagraphStyle(
-        'AmountDue',
-        parent=styles['Normal'],
-        fontSize=14,
-        fontName='Helvetica-Bold',
-        alignment=2,  # Right align
-        textColor=colors.HexColor('#1a1a1a'),
-    )
-    story.append(
-        Paragraph(f'Amount Due: {symbol}{final_total:,.2f}', amount_due_style))
+    if extra_amount_due:
+        # Add Amount Due as standalone text for better Azure recognition
+        story.append(Spacer(1, 0.1*inch))
+        story.append(
+            Paragraph(f'Amount Due: {money(final_total)}', _AMOUNT_DUE_STYLE))
 
-    doc.build(story)
+    return story
+
+
+def generate_invoice(
+    invoice_number: str, po_number: str, vendor: str, output_path: Path,
+    items: list, currency_code: str = "USD", tax_rate: float = 0.08
+):
+    """Generate invoice with specific currency and tax rate."""
+    header_rows = [
+        ['Invoice Number:', invoice_number, 'Date:',
+            datetime.now().strftime('%Y-%m-%d')],
+        ['PO Number:', po_number, 'Due Date:',
+            (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')],
+        ['Currency:', currency_code, 'Payment Terms:', 'Net 30'],
+    ]
+    from_para = Paragraph(
+        f'<b>{vendor}</b><br/>123 Business St<br/>New York, NY 10001<br/>USA',
+        _STYLES['Normal']
+    )
+    bill_to_para = Paragraph(
+        '<b>ACME Corporation</b><br/>456 Customer Ave<br/>Los Angeles, CA 90001<br/>USA',
+        _STYLES['Normal']
+    )
+    vendor_rows = [
+        ['From:', from_para],
+        ['Bill To:', bill_to_para],
+    ]
+    symbol = _get_symbol(currency_code, currency_code)
+    story = _build_common("INVOICE", header_rows, vendor_rows, items, symbol,
+                          tax_rate, 'Amount Due:', extra_amount_due=True)
+    _write_pdf(story, output_path)
 
 
 def generate_po(
     po_number: str, vendor: str, output_path: Path, items: list, currency_code: str = "USD", tax_rate: float = 0.08
 ):
     """Generate PO with specific currency and tax rate."""
-    doc = SimpleDocTemplate(str(output_path), pagesize=letter)
-    story = []
-    styles = getSampleStyleSheet()
-
-    currency_symbols = {
-        "USD": "$",
-        "EUR": "€",
-        "GBP": "£",
-        "JPY": "¥",
-        "CAD": "C$",
-        "AUD": "A$",
-    }
-    symbol = currency_symbols.get(currency_code, currency_code)
-
-    # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#1a1a1a'),
-        spaceAfter=30,
-    )
-    story.append(Paragraph("PURCHASE ORDER", title_style))
-    story.append(Spacer(1, 0.2*inch))
-
-    # Header info
-    header_data = [
+    header_rows = [
         ['PO Number:', po_number, 'Date:', datetime.now().strftime('%Y-%m-%d')],
         ['Currency:', currency_code, 'Payment Terms:', 'Net 30'],
     ]
-    header_table = Table(header_data, colWidths=[
-                         1.5*inch, 2*inch, 1.5*inch, 2*inch])
-    header_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.grey),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-    ]))
-    story.append(header_table)
-    story.append(Spacer(1, 0.3*inch))
-
-    # Vendor and Ship To
-    from_para = Paragraph(
+    ship_to_para = Paragraph(
         '<b>ACME Corporation</b><br/>456 Customer Ave<br/>Los Angeles, CA 90001<br/>USA',
-        styles['Normal']
+        _STYLES['Normal']
     )
     vendor_para = Paragraph(
         f'<b>{vendor}</b><br/>123 Business St<br/>New York, NY 10001<br/>USA',
-        styles['Normal']
+        _STYLES['Normal']
     )
-    vendor_data = [
-        ['Ship To:', from_para],
+    vendor_rows = [
+        ['Ship To:', ship_to_para],
         ['Vendor:', vendor_para],
     ]
-    vendor_table = Table(vendor_data, colWidths=[1*inch, 6*inch])
-    vendor_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.grey),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-    ]))
-    story.append(vendor_table)
-    story.append(Spacer(1, 0.3*inch))
-
-    # Line items
-    table_data = [['Item #', 'Description', 'Qty', 'Unit Price', 'Total']]
-    for item in items:
-        table_data.append([
-            item['item_num'],
-            item['description'],
-            str(item['qty']),
-            f"{symbol}{item['price']:.2f}",
-            f"{symbol}{item['total']:.2f}",
-        ])
-
-    items_table = Table(table_data, colWidths=[
-                        0.8*inch, 3*inch, 0.8*inch, 1.2*inch, 1.2*inch])
-    items_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4a5568')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('ALIGN', (2, 1), (4, -1), 'RIGHT'),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1),
-         [colors.white, colors.HexColor('#f7fafc')]),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-    ]))
-    story.append(items_table)
-    story.append(Spacer(1, 0.3*inch))
-
-    # Totals
-    subtotal = sum(item['total'] for item in items)
-    tax = subtotal * tax_rate
-    final_total = subtotal + tax
-
-    totals_data = [
-        ['Subtotal:', f'{symbol}{subtotal:,.2f}'],
-        [f'Tax ({tax_rate*100:.0f}%):', f'{symbol}{tax:,.2f}'],
-        ['Total Amount:', f'{symbol}{final_total:,.2f}'],
-    ]
-    totals_table = Table(totals_data, colWidths=[1*inch, 1.5*inch])
-    totals_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, -1), (-1, -1), 12),
-        ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-        ('TEXTCOLOR', (0, -1), (-1, -1), colors.HexColor('#1a1a1a')),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-    ]))
-    container_table = Table([[totals_table]], colWidths=[7*inch])
-    container_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
-    story.append(container_table)
-
-    doc.build(story)
+    symbol = _get_symbol(currency_code, currency_code)
+    story = _build_common("PURCHASE ORDER", header_rows, vendor_rows, items, symbol,
+                          tax_rate, 'Total Amount:', extra_amount_due=False)
+    _write_pdf(story, output_path)
 
 
 def generate_delivery_note(
     dn_number: str, po_number: str, vendor: str, output_path: Path, items: list
 ):
     """Generate delivery note (no currency/tax, just quantities)."""
-    doc = SimpleDocTemplate(str(output_path), pagesize=letter)
     story = []
-    styles = getSampleStyleSheet()
 
     # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#1a1a1a'),
-        spaceAfter=30,
-    )
-    story.append(Paragraph("DELIVERY NOTE", title_style))
+    story.append(Paragraph("DELIVERY NOTE", _TITLE_STYLE))
     story.append(Spacer(1, 0.2*inch))
 
     # Header info
@@ -356,92 +279,90 @@ def generate_delivery_note(
     ]
     header_table = Table(header_data, colWidths=[
                          1.5*inch, 2*inch, 1.5*inch, 2*inch])
-    header_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.grey),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-    ]))
+    header_table.setStyle(_HEADER_TSTYLE)
     story.append(header_table)
     story.append(Spacer(1, 0.3*inch))
 
     # From and Ship To
     from_para = Paragraph(
         f'<b>{vendor}</b><br/>123 Business St<br/>New York, NY 10001<br/>USA',
-        styles['Normal']
+        _STYLES['Normal']
     )
     ship_to_para = Paragraph(
         '<b>ACME Corporation</b><br/>456 Customer Ave<br/>Los Angeles, CA 90001<br/>USA',
-        styles['Normal']
+        _STYLES['Normal']
     )
     vendor_data = [
         ['From:', from_para],
         ['Ship To:', ship_to_para],
     ]
     vendor_table = Table(vendor_data, colWidths=[1*inch, 6*inch])
-    vendor_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.grey),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-    ]))
+    vendor_table.setStyle(_VENDOR_TSTYLE)
     story.append(vendor_table)
     story.append(Spacer(1, 0.3*inch))
 
     # Line items (no prices for delivery notes)
     table_data = [['Item #', 'Description', 'Quantity']]
-    for item in items:
-        table_data.append([
-            item['item_num'],
-            item['description'],
-            str(item['qty']),
-        ])
+    table_data.extend(
+        [item['item_num'], item['description'], str(item['qty'])] for item in items
+    )
 
     items_table = Table(table_data, colWidths=[0.8*inch, 4.5*inch, 1.2*inch])
-    items_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4a5568')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 11),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('ALIGN', (2, 1), (2, -1), 'RIGHT'),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1),
-         [colors.white, colors.HexColor('#f7fafc')]),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-    ]))
+    items_table.setStyle(_DN_ITEMS_TSTYLE)
     story.append(items_table)
 
-    doc.build(story)
+    _write_pdf(story, output_path)
 
 
+@functools.lru_cache(maxsize=128)
 def get_enterprise_prefix(company_name: str) -> str:
     """Convert company name to filename-safe prefix."""
-    # Remove common suffixes
-    prefix = company_name
-    for suffix in [" Inc", " Ltd", " Co", " Corp", " Corporation"]:
-        if prefix.endswith(suffix):
-            prefix = prefix[:-len(suffix)]
-            break
-    # Remove spaces and special chars, keep only alphanumeric
-    prefix = "".join(c for c in prefix if c.isalnum())
-    return prefix
+    # Remove a common suffix, then keep only alphanumeric characters
+    return _NONALNUM.sub('', _SUFFIX.sub('', company_name))
+
+
+def _dispatch(job):
+    """Run one (generator, args) job in a worker process and return the file name."""
+    fn, args = job
+    fn(*args)
+    return next(arg for arg in args if isinstance(arg, Path)).name
+
+
+def _prepare_assets_dir() -> Path:
+    """Resolve and create the realistic test sets directory."""
+    # Assets is mounted at /app/assets in Docker (from docker-compose.yml)
+    if os.path.exists("/app") and os.path.isdir("/app"):
+        # Docker environment
+        assets_dir = Path("/app") / "assets" / "test-sets"
+    else:
+        # Local environment
+        script_dir = Path(__file__).parent  # scripts/
+        backend_dir = script_dir.parent     # backend/
+        project_root = backend_dir.parent  # project root
+        assets_dir = project_root / "assets" / "test-sets"
+
+    # Create directory, handling case where parent might be a file
+    try:
+        assets_dir.mkdir(parents=True, exist_ok=True)
+    except (FileExistsError, PermissionError):
+        # If assets is a file, create in a different location
+        if os.path.exists("/app"):
+            assets_dir = Path("/app") / "test-sets"
+            assets_dir.mkdir(parents=True, exist_ok=True)
+        else:
+            raise
+    return assets_dir
 
 
 def main():
     """Generate realistic test PDF sets with enterprise-prefixed filenames (< 10 files)."""
     print("Generating realistic test PDF sets with enterprise prefixes...")
-    print(f"Output directory: {ASSETS_DIR}\n")
-    generated_files = []
+    assets_dir = _prepare_assets_dir()
+    print(f"Output directory: {assets_dir}\n")
+
+    # Each document is an independent CPU-bound render writing its own file, so the
+    # scenarios only collect jobs and the renders run in parallel afterwards
+    jobs = []
 
     # Scenario 1: Perfect Match (PO + Invoice + Delivery Note)
     print("[Scenario 1] Perfect Match - Complete Set (PO + Invoice + DN)")
@@ -458,24 +379,15 @@ def main():
             'qty': 5, 'price': 200.0, 'total': 1000.0},
     ]
 
-    po_file = ASSETS_DIR / f"{prefix}_po.pdf"
-    generate_po(po_number, company, po_file, items, "USD", 0.08)
-    generated_files.append(po_file.name)
-    print(f"  [OK] Generated: {po_file.name}")
-
-    invoice_file = ASSETS_DIR / f"{prefix}_invoice.pdf"
-    generate_invoice(invoice_number, po_number, company,
-                     invoice_file, items, "USD", 0.08)
-    generated_files.append(invoice_file.name)
-    print(f"  [OK] Generated: {invoice_file.name}")
-
-    dn_file = ASSETS_DIR / f"{prefix}_delivery-note.pdf"
-    generate_delivery_note(dn_number, po_number, company, dn_file, items)
-    generated_files.append(dn_file.name)
-    print(f"  [OK] Generated: {dn_file.name}")
+    jobs.append((generate_po, (po_number, company,
+                assets_dir / f"{prefix}_po.pdf", items, "USD", 0.08)))
+    jobs.append((generate_invoice, (invoice_number, po_number, company,
+                assets_dir / f"{prefix}_invoice.pdf", items, "USD", 0.08)))
+    jobs.append((generate_delivery_note, (dn_number, po_number, company,
+                assets_dir / f"{prefix}_delivery-note.pdf", items)))
 
     # Scenario 2: Tax Rate Mismatch (PO + Invoice)
-    print("\n[Scenario 2] Tax Rate Mismatch - Intentional Discrepancy")
+    print("[Scenario 2] Tax Rate Mismatch - Intentional Discrepancy")
     company = "Metro Supply Chain Solutions"
     prefix = get_enterprise_prefix(company)
     po_number = "PO-2024-002"
@@ -488,19 +400,13 @@ def main():
             'qty': 8, 'price': 150.0, 'total': 1200.0},
     ]
 
-    po_file = ASSETS_DIR / f"{prefix}_po.pdf"
-    generate_po(po_number, company, po_file, items, "USD", 0.08)
-    generated_files.append(po_file.name)
-    print(f"  [OK] Generated: {po_file.name}")
-
-    invoice_file = ASSETS_DIR / f"{prefix}_invoice.pdf"
-    generate_invoice(invoice_number, po_number, company,
-                     invoice_file, items, "USD", 0.10)  # Different tax rate
-    generated_files.append(invoice_file.name)
-    print(f"  [OK] Generated: {invoice_file.name}")
+    jobs.append((generate_po, (po_number, company,
+                assets_dir / f"{prefix}_po.pdf", items, "USD", 0.08)))
+    jobs.append((generate_invoice, (invoice_number, po_number, company,
+                assets_dir / f"{prefix}_invoice.pdf", items, "USD", 0.10)))  # Different tax rate
 
     # Scenario 3: Currency Mismatch (PO + Invoice)
-    print("\n[Scenario 3] Currency Mismatch - Intentional Discrepancy")
+    print("[Scenario 3] Currency Mismatch - Intentional Discrepancy")
     company = "Worldwide Distribution Corp"
     prefix = get_enterprise_prefix(company)
     po_number = "PO-2024-003"
@@ -511,21 +417,25 @@ def main():
             'qty': 12, 'price': 100.0, 'total': 1200.0},
     ]
 
-    po_file = ASSETS_DIR / f"{prefix}_po.pdf"
-    generate_po(po_number, company, po_file, items, "USD", 0.08)
-    generated_files.append(po_file.name)
-    print(f"  [OK] Generated: {po_file.name}")
+    jobs.append((generate_po, (po_number, company,
+                assets_dir / f"{prefix}_po.pdf", items, "USD", 0.08)))
+    jobs.append((generate_invoice, (invoice_number, po_number, company,
+                assets_dir / f"{prefix}_invoice.pdf", items, "EUR", 0.20)))  # Different currency
 
-    invoice_file = ASSETS_DIR / f"{prefix}_invoice.pdf"
-    generate_invoice(invoice_number, po_number, company,
-                     invoice_file, items, "EUR", 0.20)  # Different currency
-    generated_files.append(invoice_file.name)
-    print(f"  [OK] Generated: {invoice_file.name}")
+    print()
+    generated_files = []
+    with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as executor:
+        futures = [executor.submit(_dispatch, job) for job in jobs]
+        # Report each render as soon as it finishes rather than in submission order
+        for future in as_completed(futures):
+            file_name = future.result()
+            generated_files.append(file_name)
+            print(f"  [OK] Generated: {file_name}")
 
     print("\n" + "="*60)
     print("All realistic test PDFs generated successfully!")
     print("="*60)
-    print(f"\nLocation: {ASSETS_DIR}")
+    print(f"\nLocation: {assets_dir}")
     print(f"\nTotal files generated: {len(generated_files)}")
     print("\nGenerated files:")
     for f in generated_files:
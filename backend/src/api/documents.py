@@ -1,12 +1,12 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Header, Response
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import select
+from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel, field_serializer
-import io
+import uuid
+from pydantic import BaseModel, ConfigDict
 
-from src.core.database import get_db
+from src.core.database import DbDep
 from src.models.document import Document, DocumentType
 from src.services.document_processor import DocumentProcessor
 
@@ -25,33 +25,54 @@ class DocumentResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-    @field_serializer('created_at', 'updated_at')
-    def serialize_datetime(self, dt: datetime) -> str:
-        return dt.isoformat() if dt else None
+    model_config = ConfigDict(from_attributes=True)
 
-    class Config:
-        from_attributes = True
+
+ALLOWED_EXTENSIONS = frozenset({"pdf", "docx"})
+# Generic clients (e.g. curl -F) send octet-stream, so only reject types that are clearly wrong
+ALLOWED_CONTENT_TYPES = frozenset({
+    "application/pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/octet-stream",
+})
+
+# Only the columns DocumentResponse needs, so list endpoints skip full ORM hydration
+DOCUMENT_RESPONSE_COLUMNS = (
+    Document.id, Document.workspace_id, Document.document_type, Document.status,
+    Document.file_name, Document.file_size, Document.page_count,
+    Document.created_at, Document.updated_at,
+)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check per RFC 9110: "*" or any listed tag, compared weakly (W/ ignored)"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque_tag for tag in if_none_match.split(","))
 
 
 @router.post("/upload", response_model=DocumentResponse)
-async def upload_document(
-    workspace_id: str = Query(..., description="Workspace ID"),
-    document_type: DocumentType = Query(..., description="Document type"),
+def upload_document(
+    db: DbDep,
+    workspace_id: uuid.UUID = Query(..., description="Workspace ID"),
+    document_type: Optional[DocumentType] = Query(None, description="Document type; detected from the content when omitted"),
     file: UploadFile = File(..., description="Document file (PDF or DOCX)"),
-    db: Session = Depends(get_db),
 ):
     """Upload and process a document"""
     # Validate file extension
     if not file.filename:
         raise HTTPException(status_code=400, detail="Filename is required")
 
-    file_ext = file.filename.split(".")[-1].lower()
-    if file_ext not in ["pdf", "docx"]:
+    file_ext = file.filename.rpartition(".")[2].lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(status_code=400, detail="Only PDF and DOCX files are supported")
+    if file.content_type and file.content_type not in ALLOWED_CONTENT_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported content type: {file.content_type}")
 
     processor = DocumentProcessor(db)
     try:
-        document = await processor.process_document(workspace_id, document_type, file)
+        document = processor.process_document(str(workspace_id), document_type, file)
         # Refresh the document to get updated status
         db.refresh(document)
         return document
@@ -64,45 +85,58 @@ async def upload_document(
         raise HTTPException(status_code=500, detail=f"Failed to process document: {str(e)}")
 
 
-@router.get("/workspace/{workspace_id}", response_model=List[DocumentResponse])
-async def list_documents(workspace_id: str, db: Session = Depends(get_db)):
+@router.get("/workspace/{workspace_id}", response_model=None, responses={200: {"model": List[DocumentResponse]}})
+def list_documents(workspace_id: uuid.UUID, db: DbDep):
     """List all documents in a workspace"""
-    documents = db.query(Document).filter(Document.workspace_id == workspace_id).all()
-    return documents
+    rows = db.execute(
+        select(*DOCUMENT_RESPONSE_COLUMNS).where(Document.workspace_id == str(workspace_id))
+    ).all()
+    return [DocumentResponse.model_validate(row._mapping) for row in rows]
 
 
 @router.get("/{document_id}", response_model=DocumentResponse)
-async def get_document(document_id: str, db: Session = Depends(get_db)):
+def get_document(document_id: uuid.UUID, db: DbDep):
     """Get a document by ID"""
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = db.get(Document, str(document_id))
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     return document
 
 
 @router.get("/{document_id}/download")
-async def download_document(document_id: str, db: Session = Depends(get_db)):
+def download_document(
+    db: DbDep,
+    document_id: uuid.UUID,
+    if_none_match: str | None = Header(None),
+):
     """Download document file"""
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = db.get(Document, str(document_id))
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
 
+    cache_headers = {}
+    if document.file_etag:
+        cache_headers = {"ETag": document.file_etag, "Cache-Control": "private, max-age=3600"}
+        # Client already has this exact file, skip the storage fetch entirely
+        if if_none_match and _etag_matches(if_none_match, document.file_etag):
+            return Response(status_code=304, headers=cache_headers)
+
     processor = DocumentProcessor(db)
     try:
-        file_content = processor.get_document_file(document)
+        file_stream = processor.get_document_file_stream(document)
         return StreamingResponse(
-            io.BytesIO(file_content),
+            file_stream,
             media_type="application/pdf",
-            headers={"Content-Disposition": f'attachment; filename="{document.file_name}"'},
+            headers={"Content-Disposition": f'attachment; filename="{document.file_name}"', **cache_headers},
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to download document: {str(e)}")
 
 
 @router.delete("/{document_id}")
-async def delete_document(document_id: str, db: Session = Depends(get_db)):
+def delete_document(document_id: uuid.UUID, db: DbDep):
     """Delete a document"""
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = db.get(Document, str(document_id))
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
 
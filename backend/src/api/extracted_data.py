@@ -1,11 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException
 
-from src.core.database import get_db
+from src.core.database import DbDep
 from src.models.extracted_data import ExtractedData
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional
 from datetime import datetime
+import uuid
 
 
 router = APIRouter()
@@ -34,20 +34,20 @@ class ExtractedDataResponse(BaseModel):
     tax_amount: Optional[float]
     tax_rate: Optional[float]
     due_date: Optional[datetime]
-    line_items: List[Dict[str, Any]]
-    confidence_scores: Dict[str, float]
+    # JSONB is already parsed by the driver, so only shallow type checks here
+    line_items: list = Field(default_factory=list)
+    confidence_scores: dict = Field(default_factory=dict)
     extraction_model: str
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 @router.get("/document/{document_id}", response_model=ExtractedDataResponse)
-async def get_extracted_data(document_id: str, db: Session = Depends(get_db)):
+def get_extracted_data(document_id: uuid.UUID, db: DbDep):
     """Get extracted data for a document"""
-    extracted_data = db.query(ExtractedData).filter(ExtractedData.document_id == document_id).first()
+    extracted_data = db.query(ExtractedData).filter(ExtractedData.document_id == str(document_id)).first()
     if not extracted_data:
         raise HTTPException(status_code=404, detail="Extracted data not found for this document")
     return extracted_data
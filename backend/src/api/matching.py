@@ -1,11 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException
 from typing import List
-from pydantic import BaseModel, field_serializer
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 import json
+import uuid
 
-from src.core.database import get_db
+from src.core.database import DbDep
 from src.models.workspace import Workspace
 from src.models.document import Document, DocumentStatus
 from src.models.matching import MatchingResult
@@ -22,20 +22,15 @@ class MatchingResultResponse(BaseModel):
     delivery_note_document_id: str | None
     match_confidence: dict
     matched_by: str
-    total_po_amount: str
-    total_invoice_amount: str
+    total_po_amount: str | None
+    total_invoice_amount: str | None
     total_delivery_amount: str | None
-    total_difference: str
+    total_difference: str | None
     discrepancies: List[dict]
     created_at: datetime
     updated_at: datetime
 
-    @field_serializer('created_at', 'updated_at')
-    def serialize_datetime(self, dt: datetime) -> str:
-        return dt.isoformat() if dt else None
-
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
         
     @classmethod
     def from_orm(cls, obj):
@@ -47,10 +42,11 @@ class MatchingResultResponse(BaseModel):
             'invoice_document_id': obj.invoice_document_id,
             'delivery_note_document_id': obj.delivery_note_document_id,
             'matched_by': obj.matched_by,
-            'total_po_amount': obj.total_po_amount,
-            'total_invoice_amount': obj.total_invoice_amount,
-            'total_delivery_amount': obj.total_delivery_amount,
-            'total_difference': obj.total_difference,
+            # Numeric columns come back as Decimal; keep the string contract for clients
+            'total_po_amount': str(obj.total_po_amount) if obj.total_po_amount is not None else None,
+            'total_invoice_amount': str(obj.total_invoice_amount) if obj.total_invoice_amount is not None else None,
+            'total_delivery_amount': str(obj.total_delivery_amount) if obj.total_delivery_amount is not None else None,
+            'total_difference': str(obj.total_difference) if obj.total_difference is not None else None,
             'discrepancies': obj.discrepancies or [],
             'created_at': obj.created_at,
             'updated_at': obj.updated_at,
@@ -70,15 +66,15 @@ class MatchingResultResponse(BaseModel):
 
 
 @router.post("/workspace/{workspace_id}/match", response_model=List[MatchingResultResponse])
-async def match_documents(workspace_id: str, db: Session = Depends(get_db)):
+def match_documents(workspace_id: uuid.UUID, db: DbDep):
     """Match documents in a workspace"""
     # Verify workspace exists
-    workspace = db.query(Workspace).filter(Workspace.id == workspace_id).first()
+    workspace = db.get(Workspace, str(workspace_id))
     if not workspace:
         raise HTTPException(status_code=404, detail="Workspace not found")
 
     # Check document statuses for debugging
-    all_docs = db.query(Document).filter(Document.workspace_id == workspace_id).all()
+    all_docs = db.query(Document).filter(Document.workspace_id == str(workspace_id)).all()
     processed_docs = [d for d in all_docs if d.status == DocumentStatus.PROCESSED]
     processing_docs = [d for d in all_docs if d.status == DocumentStatus.PROCESSING]
     failed_docs = [d for d in all_docs if d.status == DocumentStatus.FAILED]
@@ -90,7 +86,7 @@ async def match_documents(workspace_id: str, db: Session = Depends(get_db)):
         )
     
     if len(processed_docs) < 2:
-        doc_types = [d.document_type.value for d in processed_docs]
+        doc_types = [d.document_type for d in processed_docs]
         raise HTTPException(
             status_code=400,
             detail=f"Need at least 2 processed documents to match. Found {len(processed_docs)} processed document(s): {', '.join(doc_types)}. Please upload at least a PO and Invoice."
@@ -98,13 +94,13 @@ async def match_documents(workspace_id: str, db: Session = Depends(get_db)):
 
     # Run matching
     matching_service = MatchingService(db)
-    results = matching_service.match_documents_in_workspace(workspace_id)
+    results = matching_service.match_documents_in_workspace(str(workspace_id))
     
     if len(results) == 0:
         # Provide helpful error message
-        po_count = len([d for d in processed_docs if d.document_type.value == "purchase_order"])
-        inv_count = len([d for d in processed_docs if d.document_type.value == "invoice"])
-        dn_count = len([d for d in processed_docs if d.document_type.value == "delivery_note"])
+        po_count = len([d for d in processed_docs if d.document_type == "purchase_order"])
+        inv_count = len([d for d in processed_docs if d.document_type == "invoice"])
+        dn_count = len([d for d in processed_docs if d.document_type == "delivery_note"])
         
         detail = f"No matches found. Processed documents: {po_count} PO(s), {inv_count} Invoice(s), {dn_count} Delivery Note(s). "
         detail += "Matching requires: (1) At least one PO and one Invoice, (2) Matching PO numbers or vendor names, (3) Extracted data with PO numbers or vendor names."
@@ -115,16 +111,16 @@ async def match_documents(workspace_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/workspace/{workspace_id}/results", response_model=List[MatchingResultResponse])
-async def get_matching_results(workspace_id: str, db: Session = Depends(get_db)):
+def get_matching_results(workspace_id: uuid.UUID, db: DbDep):
     """Get matching results for a workspace"""
     # Verify workspace exists
-    workspace = db.query(Workspace).filter(Workspace.id == workspace_id).first()
+    workspace = db.get(Workspace, str(workspace_id))
     if not workspace:
         raise HTTPException(status_code=404, detail="Workspace not found")
 
     # Get all matching results
     results = db.query(MatchingResult).filter(
-        MatchingResult.workspace_id == workspace_id
+        MatchingResult.workspace_id == str(workspace_id)
     ).all()
 
     # Convert to response models
@@ -132,9 +128,9 @@ async def get_matching_results(workspace_id: str, db: Session = Depends(get_db))
 
 
 @router.get("/{result_id}", response_model=MatchingResultResponse)
-async def get_matching_result(result_id: str, db: Session = Depends(get_db)):
+def get_matching_result(result_id: uuid.UUID, db: DbDep):
     """Get a specific matching result"""
-    result = db.query(MatchingResult).filter(MatchingResult.id == result_id).first()
+    result = db.get(MatchingResult, str(result_id))
     if not result:
         raise HTTPException(status_code=404, detail="Matching result not found")
     return MatchingResultResponse.from_orm(result)
@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse, Response
-from sqlalchemy.orm import Session
 from typing import Literal
 import io
+import uuid
 
-from src.core.database import get_db
+from src.core.database import DbDep
 from src.models.matching import MatchingResult
 from src.models.workspace import Workspace
 from src.services.report_generator import ReportGenerator
@@ -13,22 +13,22 @@ router = APIRouter()
 
 
 @router.get("/matching-result/{result_id}/pdf")
-async def download_pdf_report(result_id: str, db: Session = Depends(get_db)):
+def download_pdf_report(result_id: uuid.UUID, db: DbDep):
     """Generate and download PDF reconciliation report"""
     # Verify result exists
-    result = db.query(MatchingResult).filter(MatchingResult.id == result_id).first()
+    result = db.get(MatchingResult, str(result_id))
     if not result:
         raise HTTPException(status_code=404, detail="Matching result not found")
 
     try:
         generator = ReportGenerator(db)
-        pdf_content = generator.generate_pdf_report(result_id)
+        pdf_content = generator.generate_pdf_report(str(result_id))
         
         return StreamingResponse(
             io.BytesIO(pdf_content),
             media_type="application/pdf",
             headers={
-                "Content-Disposition": f'attachment; filename="reconciliation-report-{result_id[:8]}.pdf"'
+                "Content-Disposition": f'attachment; filename="reconciliation-report-{str(result_id)[:8]}.pdf"'
             }
         )
     except Exception as e:
@@ -36,23 +36,23 @@ async def download_pdf_report(result_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/matching-result/{result_id}/json")
-async def download_json_report(result_id: str, db: Session = Depends(get_db)):
+def download_json_report(result_id: uuid.UUID, db: DbDep):
     """Generate and download JSON reconciliation report"""
     # Verify result exists
-    result = db.query(MatchingResult).filter(MatchingResult.id == result_id).first()
+    result = db.get(MatchingResult, str(result_id))
     if not result:
         raise HTTPException(status_code=404, detail="Matching result not found")
 
     try:
         import json
         generator = ReportGenerator(db)
-        json_data = generator.generate_json_report(result_id)
+        json_data = generator.generate_json_report(str(result_id))
         
         return Response(
             content=json.dumps(json_data, indent=2),
             media_type="application/json",
             headers={
-                "Content-Disposition": f'attachment; filename="reconciliation-report-{result_id[:8]}.json"'
+                "Content-Disposition": f'attachment; filename="reconciliation-report-{str(result_id)[:8]}.json"'
             }
         )
     except Exception as e:
@@ -60,22 +60,22 @@ async def download_json_report(result_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/matching-result/{result_id}/csv")
-async def download_csv_report(result_id: str, db: Session = Depends(get_db)):
+def download_csv_report(result_id: uuid.UUID, db: DbDep):
     """Generate and download CSV reconciliation report"""
     # Verify result exists
-    result = db.query(MatchingResult).filter(MatchingResult.id == result_id).first()
+    result = db.get(MatchingResult, str(result_id))
     if not result:
         raise HTTPException(status_code=404, detail="Matching result not found")
 
     try:
         generator = ReportGenerator(db)
-        csv_content = generator.generate_csv_report(result_id)
+        csv_content = generator.generate_csv_report(str(result_id))
         
         return Response(
             content=csv_content,
             media_type="text/csv",
             headers={
-                "Content-Disposition": f'attachment; filename="reconciliation-report-{result_id[:8]}.csv"'
+                "Content-Disposition": f'attachment; filename="reconciliation-report-{str(result_id)[:8]}.csv"'
             }
         )
     except Exception as e:
@@ -83,20 +83,20 @@ async def download_csv_report(result_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/workspace/{workspace_id}/export")
-async def export_workspace_reports(
-    workspace_id: str,
+def export_workspace_reports(
+    db: DbDep,
+    workspace_id: uuid.UUID,
     format: Literal["json", "csv"] = Query(default="json"),
-    db: Session = Depends(get_db)
 ):
     """Export all matching results for a workspace"""
     # Verify workspace exists
-    workspace = db.query(Workspace).filter(Workspace.id == workspace_id).first()
+    workspace = db.get(Workspace, str(workspace_id))
     if not workspace:
         raise HTTPException(status_code=404, detail="Workspace not found")
 
     # Get all matching results
     results = db.query(MatchingResult).filter(
-        MatchingResult.workspace_id == workspace_id
+        MatchingResult.workspace_id == str(workspace_id)
     ).all()
 
     if not results:
@@ -117,7 +117,7 @@ async def export_workspace_reports(
                 content=json.dumps(all_reports, indent=2),
                 media_type="application/json",
                 headers={
-                    "Content-Disposition": f'attachment; filename="workspace-reports-{workspace_id[:8]}.json"'
+                    "Content-Disposition": f'attachment; filename="workspace-reports-{str(workspace_id)[:8]}.json"'
                 }
             )
         else:  # CSV
@@ -138,7 +138,7 @@ async def export_workspace_reports(
                 content=output.getvalue(),
                 media_type="text/csv",
                 headers={
-                    "Content-Disposition": f'attachment; filename="workspace-reports-{workspace_id[:8]}.csv"'
+                    "Content-Disposition": f'attachment; filename="workspace-reports-{str(workspace_id)[:8]}.csv"'
                 }
             )
     except Exception as e:
@@ -1,17 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import delete
-from pydantic import BaseModel, field_serializer
-from typing import List
+from fastapi import APIRouter, HTTPException
+from sqlalchemy import func, select
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional
 from datetime import datetime
 import logging
+import uuid
 
-from src.core.database import get_db
+from src.core.database import AsyncDbDep
 from src.models.workspace import Workspace
 from src.models.document import Document
 from src.models.matching import MatchingResult
 from src.models.extracted_data import ExtractedData
 from src.services.storage import storage_service
+from src.services.workspace_deleter import workspace_delete_batcher
 
 logger = logging.getLogger(__name__)
 
@@ -29,86 +31,100 @@ class WorkspaceResponse(BaseModel):
     is_temporary: bool
     created_at: datetime
     updated_at: datetime
+    # Only filled in by list_workspaces
+    document_count: Optional[int] = None
+    matching_result_count: Optional[int] = None
 
-    @field_serializer('created_at', 'updated_at')
-    def serialize_datetime(self, dt: datetime) -> str:
-        return dt.isoformat() if dt else None
-
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 @router.post("", response_model=WorkspaceResponse)
-async def create_workspace(workspace: WorkspaceCreate, db: Session = Depends(get_db)):
+async def create_workspace(workspace: WorkspaceCreate, db: AsyncDbDep):
     """Create a new workspace"""
     db_workspace = Workspace(name=workspace.name, is_temporary=workspace.is_temporary)
     db.add(db_workspace)
-    db.commit()
-    db.refresh(db_workspace)
+    await db.commit()
+    await db.refresh(db_workspace)
     return db_workspace
 
 
-@router.get("", response_model=List[WorkspaceResponse])
-async def list_workspaces(db: Session = Depends(get_db)):
+@router.get("", response_model=None, responses={200: {"model": List[WorkspaceResponse]}})
+async def list_workspaces(db: AsyncDbDep):
     """List all workspaces"""
-    workspaces = db.query(Workspace).all()
-    return workspaces
+    # Counts come from correlated subqueries so the whole list is one round-trip
+    # (joining both tables would multiply rows before counting)
+    document_count = (
+        select(func.count(Document.id))
+        .where(Document.workspace_id == Workspace.id)
+        .scalar_subquery()
+    )
+    matching_result_count = (
+        select(func.count(MatchingResult.id))
+        .where(MatchingResult.workspace_id == Workspace.id)
+        .scalar_subquery()
+    )
+    rows = (await db.execute(
+        select(
+            Workspace.id, Workspace.name, Workspace.is_temporary, Workspace.created_at, Workspace.updated_at,
+            document_count.label("document_count"),
+            matching_result_count.label("matching_result_count"),
+        )
+    )).all()
+    # Rows are built straight into JSON-ready dicts, skipping Pydantic validation/serialization
+    return [
+        {
+            "id": row.id,
+            "name": row.name,
+            "is_temporary": row.is_temporary,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+            "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+            "document_count": row.document_count,
+            "matching_result_count": row.matching_result_count,
+        }
+        for row in rows
+    ]
 
 
 @router.get("/{workspace_id}", response_model=WorkspaceResponse)
-async def get_workspace(workspace_id: str, db: Session = Depends(get_db)):
+async def get_workspace(workspace_id: uuid.UUID, db: AsyncDbDep):
     """Get a workspace by ID"""
-    workspace = db.query(Workspace).filter(Workspace.id == workspace_id).first()
+    workspace = await db.get(Workspace, str(workspace_id))
     if not workspace:
         raise HTTPException(status_code=404, detail="Workspace not found")
     return workspace
 
 
 @router.delete("/{workspace_id}")
-async def delete_workspace(workspace_id: str, db: Session = Depends(get_db)):
+async def delete_workspace(workspace_id: uuid.UUID, db: AsyncDbDep):
     """Delete a workspace and all associated data"""
-    workspace = db.query(Workspace).filter(Workspace.id == workspace_id).first()
+    workspace = await db.get(Workspace, str(workspace_id))
     if not workspace:
         raise HTTPException(status_code=404, detail="Workspace not found")
     
     try:
-        # Step 1: Get all documents in this workspace
-        documents = db.query(Document).filter(Document.workspace_id == workspace_id).all()
-        document_ids = [doc.id for doc in documents]
-        
-        # Step 2: Delete all document files from storage
-        storage_errors = []
-        for document in documents:
-            try:
-                if document.file_path:
-                    storage_service.delete_file(document.file_path)
-                    logger.info(f"Deleted file from storage: {document.file_path}")
-            except Exception as e:
-                # Log error but continue - don't fail entire deletion if storage fails
-                storage_errors.append(f"Failed to delete file {document.file_path}: {str(e)}")
-                logger.warning(f"Failed to delete file {document.file_path} from storage: {str(e)}")
-        
-        # Step 3: Delete extracted_data explicitly BEFORE deleting documents
-        # This prevents the NOT NULL constraint violation
-        deleted_extracted_data = 0
-        if document_ids:
-            deleted_extracted_data = db.query(ExtractedData).filter(
-                ExtractedData.document_id.in_(document_ids)
-            ).delete(synchronize_session=False)
-            logger.info(f"Deleted {deleted_extracted_data} extracted_data records")
-        
-        # Step 4: Delete matching results for this workspace
-        matching_results = db.query(MatchingResult).filter(MatchingResult.workspace_id == workspace_id).all()
-        for result in matching_results:
-            db.delete(result)
+        # Step 1: Count the rows the cascade will remove, for the response
+        deleted_documents = await db.scalar(
+            select(func.count(Document.id)).where(Document.workspace_id == str(workspace_id))
+        )
+        deleted_extracted_data = await db.scalar(
+            select(func.count(ExtractedData.id))
+            .join(Document, ExtractedData.document_id == Document.id)
+            .where(Document.workspace_id == str(workspace_id))
+        )
+        deleted_matching_results = await db.scalar(
+            select(func.count(MatchingResult.id)).where(MatchingResult.workspace_id == str(workspace_id))
+        )
         
-        # Step 5: Delete documents explicitly (extracted_data already deleted)
-        for document in documents:
-            db.delete(document)
+        # Step 2: Delete all document files from storage. Files live under
+        # "{workspace_id}/", so one list + bulk delete sweep covers them all.
+        # Errors are collected but don't fail the entire deletion
+        storage_errors = await run_in_threadpool(storage_service.delete_prefix, f"{workspace_id}/")
         
-        # Step 6: Delete the workspace
-        db.delete(workspace)
-        db.commit()
+        # Step 3: Delete the workspace; the database cascades to documents,
+        # extracted_data and matching_results through ON DELETE CASCADE.
+        # Concurrent deletions are coalesced into one bulk DELETE transaction
+        await db.rollback()  # End this session's read transaction before waiting on the batch
+        await workspace_delete_batcher.delete(str(workspace_id))
         
         # Log any storage errors but don't fail the request
         if storage_errors:
@@ -116,14 +132,14 @@ async def delete_workspace(workspace_id: str, db: Session = Depends(get_db)):
         
         return {
             "message": "Workspace deleted successfully",
-            "deleted_documents": len(documents),
+            "deleted_documents": deleted_documents,
             "deleted_extracted_data": deleted_extracted_data,
-            "deleted_matching_results": len(matching_results),
+            "deleted_matching_results": deleted_matching_results,
             "storage_warnings": storage_errors if storage_errors else None
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Failed to delete workspace {workspace_id}: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=500,
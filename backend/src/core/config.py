@@ -1,3 +1,6 @@
+from functools import cached_property
+import json
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -34,6 +37,13 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str | None = None
     OPENAI_MODEL: str = "gpt-4o-mini"  # Fast and cost-effective
     USE_LLM_FOR_EXTRACTION: bool = True  # Enable LLM enhancement
+    LLM_CACHE_SIZE: int = 1024  # Cached structured responses (0 disables)
+    LLM_CACHE_TTL: int = 24 * 60 * 60  # Seconds
+
+    # Form Recognizer results cache, keyed by document type and file content hash
+    FORM_RECOGNIZER_CACHE_ENABLED: bool = True
+    FORM_RECOGNIZER_CACHE_SIZE: int = 1024
+    FORM_RECOGNIZER_CACHE_TTL: int = 24 * 60 * 60  # Seconds
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -41,5 +51,16 @@ class Settings(BaseSettings):
         case_sensitive=True,
     )
 
+    @cached_property
+    def cors_origins(self) -> list[str]:
+        """CORS_ORIGINS parsed once: "*", a JSON list, or a comma-separated string"""
+        value = self.CORS_ORIGINS.strip()
+        if value.startswith("[") and value.endswith("]"):
+            try:
+                return [str(origin).strip() for origin in json.loads(value)]
+            except json.JSONDecodeError:
+                value = value[1:-1]
+        return [origin.strip().strip('"').strip("'") for origin in value.split(",") if origin.strip()]
+
 
 settings = Settings()
@@ -1,18 +1,38 @@
+from typing import Annotated
+
+from fastapi import Depends
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from src.core.config import settings
 
+# Each worker holds two pools, one per engine. They split the earlier budget of 10 + 20
+# connections, so a worker still opens at most 30; most routes use the sync engine
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
+    pool_size=8,
+    max_overflow=16,
+    pool_recycle=1800,  # Replace connections before server/proxy idle timeouts drop them
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for routes declared `async def`, so their queries don't block the event loop;
+# same database through the asyncpg driver, with the rest of the connection budget
+async_engine = create_async_engine(
+    make_url(settings.DATABASE_URL).set(drivername="postgresql+asyncpg"),
+    pool_pre_ping=True,
+    pool_size=2,
+    max_overflow=4,
+    pool_recycle=1800,
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
@@ -25,4 +45,12 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency for getting an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
 
+# Shared session dependencies so routes declare them once as `db: DbDep` / `db: AsyncDbDep`
+DbDep = Annotated[Session, Depends(get_db)]
+AsyncDbDep = Annotated[AsyncSession, Depends(get_async_db)]
@@ -1,48 +1,82 @@
+from contextlib import asynccontextmanager
+import re
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
 from src.core.config import settings
+from src.core.database import async_engine
 from src.api import workspaces, documents, matching, reports, extracted_data
+from src.services.workspace_deleter import workspace_delete_batcher
+
+
+# File downloads stream PDFs, which are already compressed and carry a strong ETag
+# for the exact bytes, so gzip must leave them untouched
+_UNCOMPRESSED_PATH_RE = re.compile(
+    r"^/api/documents/[^/]+/download$"
+    r"|^/api/reports/matching-result/[^/]+/pdf$"
+)
+
+
+class JSONGZipMiddleware:
+    """GZipMiddleware for every route except the file downloads"""
+
+    def __init__(self, app, **gzip_options):
+        self.app = app
+        self.gzip = GZipMiddleware(app, **gzip_options)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and _UNCOMPRESSED_PATH_RE.match(scope["path"]):
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await workspace_delete_batcher.start()
+    yield
+    await workspace_delete_batcher.stop()
+    await async_engine.dispose()
+
 
 app = FastAPI(
     title="InvoiceFlow API",
     description="Document Matching & Reconciliation Platform",
     version="0.1.0",
     redirect_slashes=False,  # Disable automatic trailing slash redirects
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,  # C-level JSON encoding for every endpoint
 )
 
 # CORS middleware
-# Parse CORS_ORIGINS: "*" for all origins, or comma-separated list
-# Handle cases where value might be a JSON-like string or plain string
-cors_origins_value = settings.CORS_ORIGINS.strip()
-
-# Remove brackets if present (e.g., '["http://localhost:3100"]' -> '"http://localhost:3100"')
-if cors_origins_value.startswith("[") and cors_origins_value.endswith("]"):
-    cors_origins_value = cors_origins_value[1:-1].strip()
-
-# Remove quotes if present
-if cors_origins_value.startswith('"') and cors_origins_value.endswith('"'):
-    cors_origins_value = cors_origins_value[1:-1].strip()
-elif cors_origins_value.startswith("'") and cors_origins_value.endswith("'"):
-    cors_origins_value = cors_origins_value[1:-1].strip()
-
-if cors_origins_value == "*":
-    cors_origins = ["*"]
+cors_origins = settings.cors_origins
+if "*" in cors_origins:
+    allow_origins = ["*"]
+    allow_origin_regex = None
     allow_credentials = False  # Can't use credentials with "*"
 else:
-    cors_origins = [origin.strip().strip('"').strip("'") for origin in cors_origins_value.split(",")]
+    # One anchored regex match per request instead of scanning the origin list
+    allow_origins = []
+    allow_origin_regex = "^(" + "|".join(re.escape(origin) for origin in cors_origins) + ")$"
     allow_credentials = True
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=cors_origins,
+    allow_origins=allow_origins,
+    allow_origin_regex=allow_origin_regex,
     allow_credentials=allow_credentials,
     allow_methods=["*"],  # FastAPI recommends "*" - includes OPTIONS automatically
     allow_headers=["*"],
     expose_headers=["*"],
-    max_age=3600,  # Cache preflight requests for 1 hour
+    max_age=86400,  # Cache preflight requests for 24 hours
 )
 
+# Compress JSON list payloads; added after CORS so it wraps the CORS-processed response
+app.add_middleware(JSONGZipMiddleware, minimum_size=1024, compresslevel=5)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -1,6 +1,7 @@
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, CheckConstraint
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import UUID
 import uuid
 import enum
 
@@ -22,13 +23,21 @@ class DocumentStatus(str, enum.Enum):
 
 class Document(Base):
     __tablename__ = "documents"
-
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    workspace_id = Column(String, ForeignKey("workspaces.id"), nullable=False)
-    document_type = Column(SQLEnum(DocumentType), nullable=False)
-    status = Column(SQLEnum(DocumentStatus), default=DocumentStatus.UPLOADED)
+    __table_args__ = (
+        CheckConstraint("file_size > 0", name="ck_documents_file_size_pos"),
+        CheckConstraint("page_count IS NULL OR page_count > 0", name="ck_documents_page_count_pos"),
+        CheckConstraint("document_type IN ('purchase_order', 'invoice', 'delivery_note')", name="ck_document_type"),
+        CheckConstraint("status IN ('uploaded', 'processing', 'processed', 'failed')", name="ck_document_status"),
+    )
+
+    id = Column(UUID(as_uuid=False), primary_key=True, default=lambda: str(uuid.uuid4()))
+    workspace_id = Column(UUID(as_uuid=False), ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False, index=True)
+    document_type = Column(String(32), nullable=False)  # DocumentType value
+    status = Column(String(32), default=DocumentStatus.UPLOADED.value)  # DocumentStatus value
     file_name = Column(String, nullable=False)
     file_path = Column(String, nullable=False)  # Path in MinIO
+    file_etag = Column(String)  # MinIO object ETag, for conditional downloads
+    content_hash = Column(String(64))  # SHA-256 of the file, to reuse earlier extractions
     file_size = Column(Integer, nullable=False)
     page_count = Column(Integer)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -36,7 +45,10 @@ class Document(Base):
 
     # Relationships
     workspace = relationship("Workspace", back_populates="documents")
-    extracted_data = relationship("ExtractedData", back_populates="document", uselist=False)
+    extracted_data = relationship(
+        "ExtractedData", back_populates="document", uselist=False,
+        cascade="all, delete-orphan", passive_deletes=True,
+    )
     # Note: matching_results relationship removed due to multiple foreign keys
     # Access via: MatchingResult.po_document, MatchingResult.invoice_document, etc.
 
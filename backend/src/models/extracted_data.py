@@ -1,6 +1,8 @@
+from dataclasses import dataclass
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, JSON, Numeric
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Numeric, CheckConstraint
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 import uuid
 
 from src.core.database import Base
@@ -8,9 +10,12 @@ from src.core.database import Base
 
 class ExtractedData(Base):
     __tablename__ = "extracted_data"
+    __table_args__ = (
+        CheckConstraint("total_amount IS NULL OR total_amount >= 0", name="ck_extracted_total_amount_nonneg"),
+    )
 
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    document_id = Column(String, ForeignKey("documents.id"), nullable=False, unique=True)
+    id = Column(UUID(as_uuid=False), primary_key=True, default=lambda: str(uuid.uuid4()))
+    document_id = Column(UUID(as_uuid=False), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, unique=True)
     
     # Header fields
     po_number = Column(String)
@@ -29,10 +34,10 @@ class ExtractedData(Base):
     due_date = Column(DateTime)  # Payment due date
     
     # Line items (stored as JSON)
-    line_items = Column(JSON)
+    line_items = Column(JSONB)
     
     # Extraction metadata
-    confidence_scores = Column(JSON)  # Field-level confidence scores
+    confidence_scores = Column(JSONB)  # Field-level confidence scores
     extraction_model = Column(String)  # Which model was used
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -41,19 +46,11 @@ class ExtractedData(Base):
     document = relationship("Document", back_populates="extracted_data")
 
 
+@dataclass(slots=True)
 class LineItem:
-    """Pydantic-like structure for line items (stored as JSON)"""
-    def __init__(
-        self,
-        item_number: str,
-        description: str,
-        quantity: float,
-        unit_price: float,
-        line_total: float,
-    ):
-        self.item_number = item_number
-        self.description = description
-        self.quantity = quantity
-        self.unit_price = unit_price
-        self.line_total = line_total
-
+    """Structure for line items (stored as JSON via dataclasses.asdict)"""
+    item_number: str
+    description: str
+    quantity: float
+    unit_price: float
+    line_total: float
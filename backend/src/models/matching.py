@@ -1,6 +1,9 @@
+from dataclasses import dataclass
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, ForeignKey, JSON, Enum as SQLEnum
+from typing import Optional
+from sqlalchemy import Column, String, DateTime, ForeignKey, Numeric, Enum as SQLEnum
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 import uuid
 import enum
 
@@ -26,26 +29,26 @@ class DiscrepancySeverity(str, enum.Enum):
 class MatchingResult(Base):
     __tablename__ = "matching_results"
 
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    workspace_id = Column(String, ForeignKey("workspaces.id"), nullable=False)
+    id = Column(UUID(as_uuid=False), primary_key=True, default=lambda: str(uuid.uuid4()))
+    workspace_id = Column(UUID(as_uuid=False), ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False, index=True)
     
     # Matched documents
-    po_document_id = Column(String, ForeignKey("documents.id"))
-    invoice_document_id = Column(String, ForeignKey("documents.id"))
-    delivery_note_document_id = Column(String, ForeignKey("documents.id"), nullable=True)
+    po_document_id = Column(UUID(as_uuid=False), ForeignKey("documents.id", ondelete="SET NULL"), index=True)
+    invoice_document_id = Column(UUID(as_uuid=False), ForeignKey("documents.id", ondelete="SET NULL"), index=True)
+    delivery_note_document_id = Column(UUID(as_uuid=False), ForeignKey("documents.id", ondelete="SET NULL"), nullable=True, index=True)
     
     # Matching metadata
     match_confidence = Column(String)  # JSON with confidence scores
     matched_by = Column(String)  # "po_number" or "vendor_name"
     
     # Comparison results
-    total_po_amount = Column(String)  # Numeric as string for JSON compatibility
-    total_invoice_amount = Column(String)
-    total_delivery_amount = Column(String, nullable=True)
-    total_difference = Column(String)
+    total_po_amount = Column(Numeric(14, 2))
+    total_invoice_amount = Column(Numeric(14, 2))
+    total_delivery_amount = Column(Numeric(14, 2), nullable=True)
+    total_difference = Column(Numeric(14, 2), index=True)
     
     # Discrepancies (stored as JSON array)
-    discrepancies = Column(JSON)
+    discrepancies = Column(JSONB)
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -57,25 +60,14 @@ class MatchingResult(Base):
     delivery_note_document = relationship("Document", foreign_keys=[delivery_note_document_id])
 
 
+@dataclass(slots=True)
 class Discrepancy:
-    """Pydantic-like structure for discrepancies (stored as JSON)"""
-    def __init__(
-        self,
-        type: DiscrepancyType,
-        severity: DiscrepancySeverity,
-        item_number: str,
-        description: str,
-        po_value: dict,
-        invoice_value: dict,
-        delivery_value: dict = None,
-        message: str = None,
-    ):
-        self.type = type
-        self.severity = severity
-        self.item_number = item_number
-        self.description = description
-        self.po_value = po_value
-        self.invoice_value = invoice_value
-        self.delivery_value = delivery_value
-        self.message = message
-
+    """Structure for discrepancies (stored as JSON via dataclasses.asdict)"""
+    type: DiscrepancyType
+    severity: DiscrepancySeverity
+    item_number: str
+    description: str
+    po_value: dict
+    invoice_value: dict
+    delivery_value: Optional[dict] = None
+    message: Optional[str] = None
@@ -1,6 +1,7 @@
 from datetime import datetime
 from sqlalchemy import Column, String, DateTime, Boolean
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import UUID
 import uuid
 
 from src.core.database import Base
@@ -9,14 +10,16 @@ from src.core.database import Base
 class Workspace(Base):
     __tablename__ = "workspaces"
 
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUID(as_uuid=False), primary_key=True, default=lambda: str(uuid.uuid4()))
     name = Column(String, nullable=False)
     is_temporary = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
-    documents = relationship("Document", back_populates="workspace", cascade="all, delete-orphan")
+    documents = relationship(
+        "Document", back_populates="workspace", cascade="all, delete-orphan", passive_deletes=True
+    )
 
 
 
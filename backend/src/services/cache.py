@@ -0,0 +1,67 @@
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TypeVar
+import copy
+import threading
+import time
+
+Value = TypeVar("Value")
+
+
+class TTLCache(Generic[Value]):
+    """Thread-safe in-memory LRU cache with a per-entry TTL; values are copied in and out"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Value]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _copy(value: Value) -> Value:
+        """Copy values so callers cannot mutate cached entries"""
+        return copy.deepcopy(value)
+
+    def get(self, key: Hashable) -> Optional[Value]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return self._copy(value)
+
+    def set(self, key: Hashable, value: Value):
+        if self.max_size <= 0:
+            return
+        value = self._copy(value)
+        with self._lock:
+            self._store(key, value)
+
+    def setdefault(self, key: Hashable, value: Value) -> Value:
+        """Return the live entry for key, or store value and return it (uncached when disabled)"""
+        if self.max_size <= 0:
+            return value
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                return self._copy(entry[1])
+            self._store(key, self._copy(value))
+        return value
+
+    def discard(self, key: Hashable, value: Value):
+        """Remove the entry for key if it still holds this exact value"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is value:
+                del self._entries[key]
+
+    def _store(self, key: Hashable, value: Value):
+        """Insert an entry and evict the least recently used ones; caller holds the lock"""
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
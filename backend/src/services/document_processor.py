@@ -1,16 +1,29 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from fastapi import UploadFile
-from typing import Optional
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+import os
 import uuid
 from datetime import datetime
 
 from src.models.document import Document, DocumentType, DocumentStatus
 from src.models.extracted_data import ExtractedData
 from src.services.storage import storage_service
-from src.services.form_recognizer import form_recognizer_service
+from src.services.form_recognizer import classify_pdf_text, get_form_recognizer_service, hash_content
 from src.services.pdf_utils import get_pdf_page_count, validate_pdf
 from src.core.config import settings
 
+# Recorded on each extraction; change it whenever extraction output changes so that
+# earlier results are no longer reused for re-uploads of the same file
+EXTRACTION_MODEL = "azure-form-recognizer"
+
+# ExtractedData columns copied when a re-uploaded file reuses an earlier extraction
+REUSED_COLUMNS = (
+    "po_number", "invoice_number", "delivery_note_number", "vendor_name", "vendor_address",
+    "date", "total_amount", "currency_code", "subtotal", "tax_amount", "tax_rate", "due_date",
+    "line_items", "confidence_scores",
+)
+
 
 class DocumentProcessor:
     """Service for processing uploaded documents"""
@@ -18,29 +31,32 @@ class DocumentProcessor:
     def __init__(self, db: Session):
         self.db = db
 
-    async def process_document(
+    def process_document(
         self,
         workspace_id: str,
-        document_type: DocumentType,
+        document_type: Optional[DocumentType],
         file: UploadFile,
     ) -> Document:
-        """Process uploaded document: validate, store, extract data"""
-
-        # Read file content
-        file_content = await file.read()
-
-        # Validate file size
-        if len(file_content) > settings.MAX_FILE_SIZE:
+        """Process uploaded document: validate, store, extract data (type detected when None)"""
+
+        # Validate file size from the spooled upload before reading it
+        file.file.seek(0, os.SEEK_END)
+        file_size = file.file.tell()
+        file.file.seek(0)
+        if not file_size:
+            raise ValueError("File is empty")
+        if file_size > settings.MAX_FILE_SIZE:
             raise ValueError(f"File size exceeds maximum allowed size of {settings.MAX_FILE_SIZE / 1024 / 1024}MB")
 
-        # Validate PDF
+        # Hash the spooled upload in chunks; storage and Azure read the same file object,
+        # so only PDF validation briefly holds the whole upload in memory
+        content_hash = hash_content(file.file)
+
+        # Validate PDF; an untyped text PDF is classified from its text while it is in memory
+        page_count = None
         if file.filename.endswith(".pdf"):
-            is_valid, error_msg = validate_pdf(file_content, settings.MAX_PAGES)
-            if not is_valid:
-                raise ValueError(error_msg)
-            page_count = get_pdf_page_count(file_content)
-        else:
-            page_count = None
+            page_count, detected_type = self._validate_pdf(file.file, detect_type=document_type is None)
+            document_type = document_type or detected_type
 
         # Generate unique file path
         file_id = str(uuid.uuid4())
@@ -49,28 +65,47 @@ class DocumentProcessor:
 
         # Upload to storage
         content_type = file.content_type or "application/pdf"
-        storage_service.upload_file(file_content, file_path, content_type)
-
-        # Create document record
+        file.file.seek(0)
+        file_etag = storage_service.upload_stream(file.file, file_path, content_type, size=file_size)
+
+        extracted_data_dict = None
+        if document_type is None:
+            # Detect the type and extract in one Azure analysis. A document of unknown
+            # type cannot be recorded, so a failed detection discards the upload.
+            try:
+                document_type, extracted_data_dict = get_form_recognizer_service().extract_document_auto(
+                    file.file, content_hash,
+                    load_previous=lambda: self._previous_extraction(workspace_id, content_hash),
+                )
+            except Exception as e:
+                storage_service.delete_file(file_path)
+                raise Exception(f"Failed to extract data from document: {str(e)}")
+
+        # Create document record; it is inserted together with the extracted data
+        # in a single transaction, so no transaction stays open during extraction
         document = Document(
             workspace_id=workspace_id,
-            document_type=document_type,
-            status=DocumentStatus.UPLOADED,
+            document_type=document_type.value,
+            status=DocumentStatus.PROCESSING.value,
             file_name=file.filename,
             file_path=file_path,
-            file_size=len(file_content),
+            file_etag=file_etag,
+            content_hash=content_hash,
+            file_size=file_size,
             page_count=page_count,
         )
-        self.db.add(document)
-        self.db.flush()  # Get document ID
-
-        # Update status to processing
-        document.status = DocumentStatus.PROCESSING
-        self.db.commit()
 
         try:
-            # Extract data using Azure Form Recognizer
-            extracted_data_dict = form_recognizer_service.extract_document(document_type, file_content)
+            # Extract data using Azure Form Recognizer, reusing an earlier extraction
+            # of the same file (duplicate uploads, re-processing)
+            if extracted_data_dict is None:
+                extracted_data_dict = get_form_recognizer_service().extract_document(
+                    document_type, file.file, content_hash,
+                    load_previous=lambda: self._previous_extraction(workspace_id, content_hash, document_type),
+                )
+
+            self.db.add(document)
+            self.db.flush()  # Get document ID
 
             # Create extracted data record
             extracted_data = ExtractedData(
@@ -89,26 +124,77 @@ class DocumentProcessor:
                 due_date=extracted_data_dict.get("due_date"),
                 line_items=extracted_data_dict.get("line_items", []),
                 confidence_scores=extracted_data_dict.get("confidence_scores", {}),
-                extraction_model="azure-form-recognizer",
+                extraction_model=EXTRACTION_MODEL,
             )
             self.db.add(extracted_data)
 
             # Update document status
-            document.status = DocumentStatus.PROCESSED
+            document.status = DocumentStatus.PROCESSED.value
             self.db.commit()
 
         except Exception as e:
-            # Update status to failed
-            document.status = DocumentStatus.FAILED
+            # Discard partial work and record the document as failed
+            self.db.rollback()
+            document.status = DocumentStatus.FAILED.value
+            self.db.add(document)
             self.db.commit()
             raise Exception(f"Failed to extract data from document: {str(e)}")
 
         return document
 
+    @staticmethod
+    def _validate_pdf(stream: BinaryIO, detect_type: bool = False) -> Tuple[int, Optional[DocumentType]]:
+        """Validate a PDF upload; return its page count and, if asked, its type from the text layer"""
+        # PyMuPDF needs the whole document; the bytes are dropped when this returns,
+        # before the upload is stored and analyzed
+        stream.seek(0)
+        pdf_content = stream.read()
+        stream.seek(0)
+        is_valid, error_msg = validate_pdf(pdf_content, settings.MAX_PAGES)
+        if not is_valid:
+            raise ValueError(error_msg)
+        document_type = classify_pdf_text(pdf_content) if detect_type else None
+        return get_pdf_page_count(pdf_content), document_type
+
+    def _previous_extraction(
+        self, workspace_id: str, content_hash: str, document_type: Optional[DocumentType] = None
+    ) -> Optional[Tuple[DocumentType, Dict[str, Any]]]:
+        """Type and extracted data of an earlier processed upload of the same file in this workspace"""
+        # Scoped to the uploading workspace so persisted results never cross tenants
+        query = (
+            select(Document.document_type, ExtractedData)
+            .join(Document, ExtractedData.document_id == Document.id)
+            .where(
+                Document.workspace_id == workspace_id,
+                Document.content_hash == content_hash,
+                Document.status == DocumentStatus.PROCESSED.value,
+                ExtractedData.extraction_model == EXTRACTION_MODEL,
+            )
+            .order_by(Document.created_at.desc())
+            .limit(1)
+        )
+        if document_type is not None:
+            query = query.where(Document.document_type == document_type.value)
+        previous = self.db.execute(query).first()
+        result = None
+        if previous is not None:
+            previous_type, extracted_data = previous
+            result = (
+                DocumentType(previous_type),
+                {column: getattr(extracted_data, column) for column in REUSED_COLUMNS},
+            )
+        # End the read transaction so none stays open during extraction
+        self.db.commit()
+        return result
+
     def get_document_file(self, document: Document) -> bytes:
         """Retrieve document file from storage"""
         return storage_service.get_file(document.file_path)
 
+    def get_document_file_stream(self, document: Document) -> Iterator[bytes]:
+        """Stream document file from storage in chunks"""
+        return storage_service.get_file_stream(document.file_path)
+
     def delete_document(self, document: Document):
         """Delete document and its file from storage"""
         # Delete from storage
@@ -6,17 +6,36 @@ a clean, maintainable service.
 """
 import re
 import logging
-from typing import Optional, List, Any, Dict
+from itertools import islice
+from typing import Optional, List, Any, Dict, Iterator
 
-from src.services.llm_extractor import LLMExtractor
+from src.services.llm_extractor import CombinedExtraction, LLMExtractor
 
 logger = logging.getLogger(__name__)
 
+# Regex fallback: ISO code, "Currency: XXX" or "XXX Currency" in a single pass
+_CURRENCY_RE = re.compile(
+    r'(?P<iso>\b(?:USD|EUR|GBP|JPY|CAD|AUD)\b)'
+    r'|Currency[:\s]+(?P<a>[A-Z]{3})'
+    r'|(?P<b>[A-Z]{3})\s+Currency',
+    re.IGNORECASE,
+)
+
+# Currency symbols and codes matched in one scan; the group name is the currency.
+# Codes must not touch other letters ("Europe" is not EUR, "100EUR" is), and a bare $ after C/A is
+# never USD, even when the C$/A$ alternative did not start the match
+_SYMBOL_RE = re.compile(
+    r'(?P<EUR>€|(?i:(?<![a-z])EUR(?:OS?)?(?![a-z])))|(?P<GBP>£|(?i:(?<![a-z])GBP(?![a-z])))'
+    r'|(?P<CAD>C\$)|(?P<AUD>A\$)|(?P<USD>(?<![CA])\$)'
+)
+# When several symbols appear, the lowest rank wins
+_SYMBOL_RANK = {"EUR": 0, "GBP": 1, "CAD": 2, "AUD": 3, "USD": 4}
+
 
 class CurrencyExtractor:
     """Extracts currency code from documents using multiple methods"""
 
-    SUPPORTED_CURRENCIES = ["USD", "EUR", "GBP", "JPY", "CAD", "AUD"]
+    SUPPORTED_CURRENCIES: frozenset[str] = frozenset({"USD", "EUR", "GBP", "JPY", "CAD", "AUD"})
 
     def __init__(self, llm_extractor: LLMExtractor):
         self.llm_extractor = llm_extractor
@@ -26,6 +45,7 @@ class CurrencyExtractor:
         azure_result: Any,
         extracted_data: Dict[str, Any],
         document_fields: Optional[Dict] = None,
+        combined: Optional[CombinedExtraction] = None,
     ) -> Optional[str]:
         """
         Extract currency code with priority:
@@ -38,6 +58,7 @@ class CurrencyExtractor:
             azure_result: Azure Form Recognizer result object
             extracted_data: Partially extracted data dict (may contain line_items, etc.)
             document_fields: Azure document fields dict (optional, for invoices)
+            combined: Per-document LLM extraction; used instead of a separate currency request
 
         Returns:
             Currency code (e.g., "USD") or None if not found
@@ -49,168 +70,184 @@ class CurrencyExtractor:
             currency_code = self._extract_from_azure_fields(document_fields)
             if currency_code:
                 logger.info(
-                    f"[CURRENCY] Extracted from Azure fields: {currency_code}")
+                    "[CURRENCY] Extracted from Azure fields: %s", currency_code)
                 return currency_code
 
         # Method 2: Extract from Azure CurrencyCode field
-        if hasattr(azure_result, "documents") and azure_result.documents:
-            for doc in azure_result.documents:
-                if hasattr(doc, "fields") and "CurrencyCode" in doc.fields:
-                    currency = doc.fields["CurrencyCode"].value
-                    if currency:
-                        currency_code = str(currency).upper()
-                        logger.info(
-                            f"[CURRENCY] Extracted from CurrencyCode field: {currency_code}")
-                        return currency_code
+        currency_code = self._extract_from_currency_code_field(azure_result)
+        if currency_code:
+            logger.info(
+                "[CURRENCY] Extracted from CurrencyCode field: %s", currency_code)
+            return currency_code
 
         # Method 3: LLM extraction (if enabled)
         if self.llm_extractor.enabled:
             currency_code = self._extract_with_llm(
-                azure_result, extracted_data)
+                azure_result, extracted_data, combined)
             if currency_code:
-                logger.info(f"[CURRENCY] LLM extracted: {currency_code}")
+                logger.info("[CURRENCY] LLM extracted: %s", currency_code)
                 return currency_code
 
         # Method 4: Infer from symbols in line items
         currency_code = self._infer_from_symbols(extracted_data)
         if currency_code:
-            logger.info(f"[CURRENCY] Inferred from symbols: {currency_code}")
+            logger.info("[CURRENCY] Inferred from symbols: %s", currency_code)
             return currency_code
 
         logger.warning(
             "[CURRENCY] Currency extraction failed - no currency found")
         return None
 
+    def needs_llm(self, azure_result: Any, document_fields: Optional[Dict] = None) -> bool:
+        """Whether extract() would fall back to the LLM (no currency in the Azure fields)"""
+        if document_fields and self._extract_from_azure_fields(document_fields):
+            return False
+        return self._extract_from_currency_code_field(azure_result) is None
+
+    def _extract_from_currency_code_field(self, azure_result: Any) -> Optional[str]:
+        """Extract currency from the Azure CurrencyCode field"""
+        for doc in getattr(azure_result, "documents", None) or ():
+            fields = getattr(doc, "fields", None)
+            currency = getattr(fields.get("CurrencyCode"), "value", None) if fields else None
+            if currency:
+                return str(currency).upper()
+        return None
+
     def _extract_from_azure_fields(self, document_fields: Dict) -> Optional[str]:
         """Extract currency from Azure CurrencyValue fields"""
         # Check AmountDue, InvoiceTotal, Total fields for currency_code
-        for field_name in ["AmountDue", "InvoiceTotal", "Total"]:
-            if field_name in document_fields:
-                field_value = document_fields[field_name].value
-                if field_value and hasattr(field_value, "currency_code") and field_value.currency_code:
-                    return str(field_value.currency_code).upper()
+        get_field = document_fields.get
+        for field_name in ("AmountDue", "InvoiceTotal", "Total"):
+            field_value = getattr(get_field(field_name), "value", None)
+            currency_code = getattr(field_value, "currency_code", None)
+            if currency_code:
+                return str(currency_code).upper()
         return None
 
     def _extract_with_llm(
-        self, azure_result: Any, extracted_data: Dict[str, Any]
+        self,
+        azure_result: Any,
+        extracted_data: Dict[str, Any],
+        combined: Optional[CombinedExtraction] = None,
     ) -> Optional[str]:
         """Extract currency using LLM from document text"""
         # Collect text from multiple sources
-        text_content = self._collect_text_content(azure_result, extracted_data)
+        text_content = self.collect_text_content(azure_result, extracted_data)
 
         if not text_content:
             return None
 
-        # Use LLM extraction
-        llm_currency = self.llm_extractor.extract_currency(text_content)
+        # Use LLM extraction (reuse the combined per-document request when available)
+        if combined is not None:
+            llm_currency = combined.currency
+        else:
+            llm_currency = self.llm_extractor.extract_currency(text_content)
         if llm_currency and llm_currency.currency_code and llm_currency.confidence > 0.7:
             return llm_currency.currency_code.upper()
 
         # Fallback: regex on collected text
         return self._extract_with_regex(text_content)
 
-    def _collect_text_content(
+    def collect_text_content(
         self, azure_result: Any, extracted_data: Dict[str, Any]
     ) -> str:
         """Collect text content from various sources for currency extraction"""
-        text_parts = []
+        # Limit to first 50 segments; later sources are never stringified
+        return "\n".join(islice(self._iter_text_parts(azure_result, extracted_data), 50))
+
+    def _iter_text_parts(
+        self, azure_result: Any, extracted_data: Dict[str, Any]
+    ) -> Iterator[str]:
+        """Yield text segments from each source in priority order"""
+        has_paragraphs = False
 
         # From paragraphs
         if hasattr(azure_result, "paragraphs") and azure_result.paragraphs:
-            text_parts.extend(
-                [para.content for para in azure_result.paragraphs[:20]])
+            for para in azure_result.paragraphs[:20]:
+                has_paragraphs = True
+                yield para.content
 
         # From pages (alternative structure)
-        if not text_parts and hasattr(azure_result, "pages") and azure_result.pages:
+        if not has_paragraphs and hasattr(azure_result, "pages") and azure_result.pages:
             for page in azure_result.pages:
                 if hasattr(page, "paragraphs"):
-                    text_parts.extend(
-                        [para.content for para in page.paragraphs])
+                    for para in page.paragraphs:
+                        yield para.content
 
         # From document fields
         if hasattr(azure_result, "documents") and azure_result.documents:
             for doc in azure_result.documents:
                 if hasattr(doc, "fields"):
-                    for field_name, field_value in doc.fields.items():
-                        if field_value and hasattr(field_value, "value"):
-                            field_str = str(field_value.value)
-                            if field_str:
-                                text_parts.append(field_str)
+                    for field_value in doc.fields.values():
+                        value = getattr(field_value, "value", None)
+                        if isinstance(value, str):
+                            if value:
+                                yield value
+                        elif isinstance(value, (int, float)):
+                            yield str(value)
+                        else:
+                            # Skip dates, addresses, lists, etc.; from currency values keep only the code/symbol
+                            currency = getattr(value, "currency_code", None) or getattr(value, "symbol", None)
+                            if currency:
+                                yield str(currency)
 
         # From line items
         for item in extracted_data.get("line_items", []):
             if item.get("description"):
-                text_parts.append(str(item["description"]))
+                yield str(item["description"])
             if item.get("unit_price"):
-                text_parts.append(str(item["unit_price"]))
+                yield str(item["unit_price"])
 
         # From already extracted fields
         for field in ["vendor_name", "invoice_number", "total_amount"]:
             if extracted_data.get(field):
-                text_parts.append(str(extracted_data[field]))
-
-        return "\n".join(text_parts[:50])  # Limit to first 50 segments
+                yield str(extracted_data[field])
 
     def _extract_with_regex(self, text: str) -> Optional[str]:
         """Extract currency code using regex patterns"""
         if not text:
             return None
 
-        currency_patterns = [
-            r'\b(USD|EUR|GBP|JPY|CAD|AUD)\b',
-            r'Currency[:\s]+([A-Z]{3})',
-            r'([A-Z]{3})\s+Currency',
-        ]
-
-        for pattern in currency_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                currency_code = match.group(1).upper()
-                if currency_code in self.SUPPORTED_CURRENCIES:
-                    return currency_code
+        for match in _CURRENCY_RE.finditer(text):
+            currency_code = (match.group("iso") or match.group("a") or match.group("b")).upper()
+            if currency_code in self.SUPPORTED_CURRENCIES:
+                return currency_code
 
         return None
 
     def _infer_from_symbols(self, extracted_data: Dict[str, Any]) -> Optional[str]:
         """Infer currency from symbols in line item prices"""
-        # Check line items for currency symbols
-        for item in extracted_data.get("line_items", []):
-            price_str = ""
-            if item.get("unit_price"):
-                price_str = str(item["unit_price"])
-            elif item.get("line_total"):
-                price_str = str(item["line_total"])
-
-            if price_str:
-                # Check for currency symbols (order matters - EUR before USD)
-                if "€" in price_str or "EUR" in price_str.upper():
-                    return "EUR"
-                elif "£" in price_str or "GBP" in price_str.upper():
-                    return "GBP"
-                elif "C$" in price_str:
-                    return "CAD"
-                elif "A$" in price_str:
-                    return "AUD"
-                elif "$" in price_str:
-                    return "USD"
+        # Check line item prices for currency symbols, all items in one scan
+        prices = "\n".join(
+            str(item.get("unit_price") or item.get("line_total") or "")
+            for item in extracted_data.get("line_items", [])
+        )
+        if prices:
+            currency_code = self._match_symbols(prices)
+            if currency_code:
+                return currency_code
 
         # Check collected text content for symbols
-        text_content = ""
-        for field in ["vendor_name", "invoice_number", "total_amount"]:
-            if extracted_data.get(field):
-                text_content += str(extracted_data[field]) + " "
-
+        text_content = " ".join(
+            str(extracted_data[field])
+            for field in ["vendor_name", "invoice_number", "total_amount"]
+            if extracted_data.get(field)
+        )
         if text_content:
-            text_upper = text_content.upper()
-            if "€" in text_content or "EUR" in text_upper or "EURO" in text_upper:
-                return "EUR"
-            elif "£" in text_content or "GBP" in text_upper:
-                return "GBP"
-            elif "$" in text_content and "C$" not in text_content and "A$" not in text_content:
-                return "USD"
-            elif "C$" in text_content:
-                return "CAD"
-            elif "A$" in text_content:
-                return "AUD"
+            return self._match_symbols(text_content)
 
         return None
+
+    @staticmethod
+    def _match_symbols(text: str) -> Optional[str]:
+        """Return the highest-priority currency whose symbol or code appears in text"""
+        best = None
+        best_rank = len(_SYMBOL_RANK)
+        for match in _SYMBOL_RE.finditer(text):
+            currency_code = match.lastgroup
+            rank = _SYMBOL_RANK[currency_code]
+            if rank < best_rank:
+                best, best_rank = currency_code, rank
+                if rank == 0:
+                    break  # Nothing outranks EUR, stop scanning
+        return best
@@ -4,12 +4,16 @@ Tax Extraction and Validation Service
 Handles tax amount and tax rate extraction with validation logic.
 """
 import logging
+import re
 from typing import Optional, Dict, Any, Tuple
 
-from src.services.llm_extractor import LLMExtractor
+from src.services.llm_extractor import CombinedExtraction, LLMExtractor
 
 logger = logging.getLogger(__name__)
 
+# Tax keywords plus currency amounts ("subtotal" is covered by "total")
+_TAX_KEYWORDS_RE = re.compile(r'tax|vat|total|%|€|£|\$\s?\d', re.IGNORECASE)
+
 
 class TaxExtractor:
     """Extracts and validates tax information from documents"""
@@ -22,6 +26,7 @@ class TaxExtractor:
         document_fields: Dict,
         extracted_data: Dict[str, Any],
         azure_result: Any,
+        combined: Optional[CombinedExtraction] = None,
     ) -> Tuple[Optional[float], Optional[float], Optional[float]]:
         """
         Extract and validate tax amount, tax rate, and subtotal.
@@ -30,32 +35,37 @@ class TaxExtractor:
             document_fields: Azure document fields
             extracted_data: Partially extracted data dict
             azure_result: Azure Form Recognizer result object
+            combined: Per-document LLM extraction; used instead of separate tax requests
 
         Returns:
             Tuple of (tax_amount, tax_rate, confidence) or (None, None, None)
         """
+        total_amount = extracted_data.get("total_amount")
+        subtotal = extracted_data.get("subtotal")
+        extracted_tax_amount = extracted_data.get("tax_amount")
+
         # Extract tax amount from Azure fields (if available)
-        tax_amount, tax_confidence = self._extract_tax_amount(
-            document_fields, extracted_data)
+        tax_amount, tax_confidence = self._extract_tax_amount(document_fields)
 
         # If tax_amount already exists in extracted_data (e.g., from LLM), use it
-        if tax_amount is None and extracted_data.get("tax_amount"):
-            tax_amount = extracted_data["tax_amount"]
+        if tax_amount is None and extracted_tax_amount:
+            tax_amount = extracted_tax_amount
             tax_confidence = 0.8  # Default confidence for extracted values
 
         # Validate tax amount is reasonable
-        if tax_amount is not None and extracted_data.get("total_amount"):
-            if not self._validate_tax_amount_reasonable(tax_amount, extracted_data["total_amount"]):
+        if tax_amount is not None and total_amount:
+            if not self._validate_tax_amount_reasonable(tax_amount, total_amount):
                 tax_amount = None
                 tax_confidence = None
 
         # Extract and validate tax rate
-        if tax_amount is not None and extracted_data.get("subtotal") and extracted_data["subtotal"] > 0:
+        if tax_amount is not None and subtotal and subtotal > 0:
             tax_rate, final_tax_amount = self._extract_and_validate_tax_rate(
                 tax_amount,
-                extracted_data["subtotal"],
+                subtotal,
                 document_fields,
                 azure_result,
+                combined,
             )
 
             if tax_rate:
@@ -63,56 +73,71 @@ class TaxExtractor:
 
         return tax_amount, None, tax_confidence
 
-    def _extract_tax_amount(
+    def tax_amount_for_validation(
         self, document_fields: Dict, extracted_data: Dict[str, Any]
+    ) -> Optional[float]:
+        """Tax amount extract_and_validate will validate, so the validation can be requested up front"""
+        tax_amount, _ = self._extract_tax_amount(document_fields)
+        if tax_amount is None:
+            tax_amount = extracted_data.get("tax_amount")
+        total_amount = extracted_data.get("total_amount")
+        if tax_amount is not None and total_amount and tax_amount >= total_amount:
+            return None
+        return tax_amount
+
+    def needs_llm(self, document_fields: Dict, extracted_data: Dict[str, Any]) -> bool:
+        """Whether extract_and_validate would reach the LLM tax rate/validation steps"""
+        tax_amount = self.tax_amount_for_validation(document_fields, extracted_data)
+        subtotal = extracted_data.get("subtotal")
+        if tax_amount is None or not subtotal or subtotal <= 0:
+            return False
+        return not self._azure_rate_agrees(tax_amount, subtotal, document_fields)
+
+    def _azure_rate_agrees(self, tax_amount: float, subtotal: float, document_fields: Dict) -> bool:
+        """Whether Azure's TaxRate matches the rate implied by tax_amount / subtotal"""
+        azure_tax_rate = self._extract_azure_tax_rate(document_fields)
+        return bool(azure_tax_rate) and abs(azure_tax_rate - (tax_amount / subtotal) * 100) < 0.5
+
+    def _extract_tax_amount(
+        self, document_fields: Dict
     ) -> Tuple[Optional[float], Optional[float]]:
         """Extract tax amount from Azure fields"""
-        tax_amount = None
-        tax_confidence = None
-
-        # Try "Tax" field first (most specific)
-        if "Tax" in document_fields:
-            tax_field = document_fields["Tax"].value
-            if tax_field:
-                try:
-                    tax_amount = float(tax_field.amount)
-                    tax_confidence = document_fields["Tax"].confidence
-                    logger.info(
-                        f"[TAX] Extracted from 'Tax' field: ${tax_amount:.2f} (confidence: {tax_confidence:.2f})"
-                    )
-                except (ValueError, TypeError, AttributeError) as e:
-                    logger.warning(
-                        f"[TAX] Failed to extract from 'Tax' field: {e}")
-
-        # Fallback to "TotalTax" field
-        if tax_amount is None and "TotalTax" in document_fields:
-            tax_field = document_fields["TotalTax"].value
-            if tax_field:
-                try:
-                    tax_amount = float(tax_field.amount)
-                    tax_confidence = document_fields["TotalTax"].confidence
-                    logger.info(
-                        f"[TAX] Extracted from 'TotalTax' field: ${tax_amount:.2f} (confidence: {tax_confidence:.2f})"
-                    )
-                except (ValueError, TypeError, AttributeError) as e:
-                    logger.warning(
-                        f"[TAX] Failed to extract from 'TotalTax' field: {e}")
+        # Try "Tax" field first (most specific), then fall back to "TotalTax"
+        get_field = document_fields.get
+        for field_name in ("Tax", "TotalTax"):
+            field = get_field(field_name)
+            if not field:
+                continue
+            try:
+                tax_amount = float(getattr(getattr(field, "value", None), "amount", None))
+            except (ValueError, TypeError) as e:
+                logger.warning(
+                    "[TAX] Failed to extract from '%s' field: %s", field_name, e)
+                continue
+            tax_confidence = getattr(field, "confidence", None)
+            logger.info(
+                "[TAX] Extracted from '%s' field: $%.2f (confidence: %s)",
+                field_name, tax_amount, tax_confidence,
+            )
+            return tax_amount, tax_confidence
 
-        return tax_amount, tax_confidence
+        return None, None
 
     def _validate_tax_amount_reasonable(self, tax_amount: float, total_amount: float) -> bool:
         """Validate that tax amount is reasonable (not the total amount)"""
         # Tax should be less than total (usually 0-30% of total)
         if tax_amount >= total_amount:
             logger.warning(
-                f"[TAX] VALIDATION FAILED: tax_amount (${tax_amount:.2f}) >= total_amount (${total_amount:.2f}). "
-                f"This is likely an extraction error - extracted 'Total' instead of 'Tax'"
+                "[TAX] VALIDATION FAILED: tax_amount ($%.2f) >= total_amount ($%.2f). "
+                "This is likely an extraction error - extracted 'Total' instead of 'Tax'",
+                tax_amount, total_amount,
             )
             return False
         elif tax_amount > total_amount * 0.5:
             logger.warning(
-                f"[TAX] VALIDATION WARNING: tax_amount (${tax_amount:.2f}) is >50% of total (${total_amount:.2f}). "
-                f"This is unusually high - may be extraction error"
+                "[TAX] VALIDATION WARNING: tax_amount ($%.2f) is >50%% of total ($%.2f). "
+                "This is unusually high - may be extraction error",
+                tax_amount, total_amount,
             )
         return True
 
@@ -122,6 +147,7 @@ class TaxExtractor:
         subtotal: float,
         document_fields: Dict,
         azure_result: Any,
+        combined: Optional[CombinedExtraction] = None,
     ) -> Tuple[Optional[float], float]:
         """
         Extract tax rate and validate/correct tax amount.
@@ -132,33 +158,45 @@ class TaxExtractor:
         # Calculate tax rate from tax amount and subtotal (ground truth)
         calculated_tax_rate = (tax_amount / subtotal) * 100
 
+        # Clean documents: Azure's rate agrees with the calculated one, so tax_amount is
+        # consistent. needs_llm() reports this case too, so no LLM request was made for tax
+        if self._azure_rate_agrees(tax_amount, subtotal, document_fields):
+            logger.info(
+                "[TAX] Azure tax_rate agrees with calculated tax_rate (%.2f%%)", calculated_tax_rate)
+            return calculated_tax_rate, tax_amount
+
         # Get Azure's tax_rate if available (may be wrong)
         azure_tax_rate = self._extract_azure_tax_rate(document_fields)
 
+        # Document text for the LLM steps below, built once
+        doc_text = self.get_tax_relevant_text(azure_result) if self.llm_extractor.enabled else ""
+
         # STEP 1: Use LLM to extract tax_rate from document text (most reliable)
         llm_tax_rate = None
         if self.llm_extractor.enabled:
-            doc_text = self._get_tax_relevant_text(azure_result)
-            if doc_text:
-                llm_tax = self.llm_extractor.extract_tax_rate(doc_text)
-                if llm_tax and llm_tax.tax_rate and llm_tax.confidence > 0.7:
-                    llm_tax_rate = llm_tax.tax_rate
-                    logger.info(
-                        f"[TAX] LLM extracted tax_rate: {llm_tax_rate}% (confidence: {llm_tax.confidence:.2f})"
-                    )
+            if combined is not None:
+                llm_tax = combined.tax
+            else:
+                llm_tax = self.llm_extractor.extract_tax_rate(doc_text) if doc_text else None
+            if llm_tax and llm_tax.tax_rate and llm_tax.confidence > 0.7:
+                llm_tax_rate = llm_tax.tax_rate
+                logger.info(
+                    "[TAX] LLM extracted tax_rate: %s%% (confidence: %.2f)",
+                    llm_tax_rate, llm_tax.confidence,
+                )
 
         # STEP 2: Determine which tax_rate to use (priority: LLM > Calculated > Azure)
         final_tax_rate = None
         if llm_tax_rate:
             final_tax_rate = llm_tax_rate
-            logger.info(f"[TAX] Using LLM tax_rate: {final_tax_rate}%")
+            logger.info("[TAX] Using LLM tax_rate: %s%%", final_tax_rate)
         elif calculated_tax_rate:
             final_tax_rate = calculated_tax_rate
-            logger.info(f"[TAX] Using calculated tax_rate: {final_tax_rate}%")
+            logger.info("[TAX] Using calculated tax_rate: %s%%", final_tax_rate)
         elif azure_tax_rate:
             final_tax_rate = azure_tax_rate
             logger.warning(
-                f"[TAX] Using Azure tax_rate (may be unreliable): {final_tax_rate}%")
+                "[TAX] Using Azure tax_rate (may be unreliable): %s%%", final_tax_rate)
 
         if not final_tax_rate:
             return None, tax_amount
@@ -171,39 +209,43 @@ class TaxExtractor:
         # Warn if Azure rate differs significantly
         if azure_tax_rate and abs(azure_tax_rate - final_tax_rate) > 0.5:
             logger.warning(
-                f"[TAX] Azure tax_rate ({azure_tax_rate}%) differs from chosen rate ({final_tax_rate}%) - Azure may be wrong"
+                "[TAX] Azure tax_rate (%s%%) differs from chosen rate (%s%%) - Azure may be wrong",
+                azure_tax_rate, final_tax_rate,
             )
 
         # Use LLM validation if available
         if self.llm_extractor.enabled:
-            doc_text = self._get_tax_relevant_text(azure_result)
-            validation = self.llm_extractor.validate_tax_discrepancy(
-                extracted_tax_amount=tax_amount,
-                calculated_tax_amount=expected_tax_amount,
-                subtotal=subtotal,
-                tax_rate=final_tax_rate,
-                document_context=doc_text,
-            )
+            # Reuse the combined request if it validated this exact tax amount and subtotal
+            validation = combined.validation_for(tax_amount, subtotal) if combined is not None else None
+            if validation is None:
+                validation = self.llm_extractor.validate_tax_discrepancy(
+                    extracted_tax_amount=tax_amount,
+                    calculated_tax_amount=expected_tax_amount,
+                    subtotal=subtotal,
+                    tax_rate=final_tax_rate,
+                    document_context=doc_text,
+                )
 
             if validation and validation.confidence > 0.7:
                 logger.info(
-                    f"[TAX VALIDATION] LLM result: is_extraction_error={validation.is_extraction_error}, "
-                    f"confidence={validation.confidence:.2f}, reasoning={validation.reasoning[:100]}"
+                    "[TAX VALIDATION] LLM result: is_extraction_error=%s, confidence=%.2f, reasoning=%.100s",
+                    validation.is_extraction_error, validation.confidence, validation.reasoning,
                 )
                 if validation.is_extraction_error:
                     logger.info(
-                        f"[TAX VALIDATION] CORRECTING: Using calculated tax_amount={expected_tax_amount:.2f} "
-                        f"instead of extracted={tax_amount:.2f}"
+                        "[TAX VALIDATION] CORRECTING: Using calculated tax_amount=%.2f instead of extracted=%.2f",
+                        expected_tax_amount, tax_amount,
                     )
                     return final_tax_rate, expected_tax_amount
                 else:
                     logger.info(
-                        f"[TAX VALIDATION] Real discrepancy detected, keeping extracted tax_amount={tax_amount:.2f}"
+                        "[TAX VALIDATION] Real discrepancy detected, keeping extracted tax_amount=%.2f", tax_amount
                     )
                     return final_tax_rate, tax_amount
             elif difference > tolerance:
                 logger.warning(
-                    f"[TAX VALIDATION] LLM validation failed, but difference={difference:.2f} > tolerance={tolerance:.2f}, using calculated"
+                    "[TAX VALIDATION] LLM validation failed, but difference=%.2f > tolerance=%.2f, using calculated",
+                    difference, tolerance,
                 )
                 return final_tax_rate, expected_tax_amount
             else:
@@ -212,13 +254,13 @@ class TaxExtractor:
         else:
             # No LLM - use simple validation
             logger.info(
-                f"[TAX VALIDATION] LLM not enabled, using simple validation. "
-                f"Difference={difference:.2f}, Tolerance={tolerance:.2f}"
+                "[TAX VALIDATION] LLM not enabled, using simple validation. Difference=%.2f, Tolerance=%.2f",
+                difference, tolerance,
             )
             if difference > tolerance:
                 logger.info(
-                    f"[TAX VALIDATION] CORRECTING: Using calculated tax_amount={expected_tax_amount:.2f} "
-                    f"instead of extracted={tax_amount:.2f}"
+                    "[TAX VALIDATION] CORRECTING: Using calculated tax_amount=%.2f instead of extracted=%.2f",
+                    expected_tax_amount, tax_amount,
                 )
                 return final_tax_rate, expected_tax_amount
             else:
@@ -243,14 +285,12 @@ class TaxExtractor:
 
         return None
 
-    def _get_tax_relevant_text(self, azure_result: Any) -> str:
+    def get_tax_relevant_text(self, azure_result: Any) -> str:
         """Get text content relevant to tax extraction"""
         if not hasattr(azure_result, "paragraphs"):
             return ""
 
-        doc_text = "\n".join([
+        return "\n".join([
             para.content for para in azure_result.paragraphs
-            if any(keyword in para.content.lower() for keyword in ["tax", "vat", "total", "subtotal", "%"])
+            if _TAX_KEYWORDS_RE.search(para.content)
         ])
-
-        return doc_text
@@ -1,38 +1,304 @@
 from azure.ai.formrecognizer import DocumentAnalysisClient
 from azure.core.credentials import AzureKeyCredential
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, List, Tuple, BinaryIO, Union
+import copy
+from concurrent.futures import Future
+from functools import cached_property, lru_cache, partial
+import hashlib
 import io
 import logging
+import re
 
 from src.core.config import settings
 from src.models.document import DocumentType
-from src.services.llm_extractor import LLMExtractor
+from src.services.cache import TTLCache
+from src.services.llm_extractor import CombinedExtraction, LLMExtractor
+from src.services.pdf_utils import extract_text_from_pdf
 from src.services.extraction.currency_extractor import CurrencyExtractor
 from src.services.extraction.tax_extractor import TaxExtractor
 
 logger = logging.getLogger(__name__)
 
 
+def _as_money(value: Any) -> float:
+    """Amount of a CurrencyValue, or the value itself"""
+    amount = getattr(value, "amount", None)
+    return float(value if amount is None else amount)
+
+
+# Paragraph labels for the layout model, matched case-insensitively without lowercasing each paragraph
+_PO_NUMBER_LABEL_RE = re.compile(r"po number:|purchase order:", re.IGNORECASE)
+_PO_VENDOR_LABEL_RE = re.compile(r"vendor:", re.IGNORECASE)
+_DN_NUMBER_LABEL_RE = re.compile(r"delivery note|dn", re.IGNORECASE)
+_DN_NUMBER_RE = re.compile(r"dn-", re.IGNORECASE)
+_DN_PO_NUMBER_LABEL_RE = re.compile(r"po number:", re.IGNORECASE)
+_DN_VENDOR_LABEL_RE = re.compile(r"from:", re.IGNORECASE)
+
+# Leading bytes of the formats Azure can analyze (DOCX is a ZIP container)
+_FILE_SIGNATURES = (
+    b"%PDF-",
+    b"PK\x03\x04",
+    b"\xff\xd8\xff",
+    b"\x89PNG\r\n\x1a\n",
+    b"II*\x00",
+    b"MM\x00*",
+    b"BM",
+)
+
+
+# Document bytes, or a seekable binary stream (e.g. the spooled upload file)
+DocumentContent = Union[bytes, BinaryIO]
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_content(file_content: DocumentContent) -> str:
+    """SHA-256 hex digest of the document, reading streams in chunks"""
+    if isinstance(file_content, bytes):
+        return hashlib.sha256(file_content).hexdigest()
+    digest = hashlib.sha256()
+    file_content.seek(0)
+    for chunk in iter(partial(file_content.read, _HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    file_content.seek(0)
+    return digest.hexdigest()
+
+
+def _rewind(file_content: DocumentContent) -> DocumentContent:
+    """Streams are read from the start by every analysis"""
+    if not isinstance(file_content, bytes):
+        file_content.seek(0)
+    return file_content
+
+
+def _validate_content(file_content: DocumentContent) -> None:
+    """Reject empty or unrecognized files before sending them to Azure"""
+    if isinstance(file_content, bytes):
+        head = file_content[:8]
+    else:
+        head = _rewind(file_content).read(8)
+        file_content.seek(0)
+    if not head:
+        raise ValueError("File is empty")
+    if not head.startswith(_FILE_SIGNATURES):
+        raise ValueError("Unsupported or corrupted file: unrecognized file signature")
+
+
+# Document titles for type detection; the earliest one in the content wins
+_DOCUMENT_TITLE_RE = re.compile(
+    r"(?P<delivery_note>delivery\s+note|packing\s+slip|goods\s+received)"
+    r"|(?P<purchase_order>purchase\s+order)"
+    r"|(?P<invoice>\binvoice\b)",
+    re.IGNORECASE,
+)
+
+
+def _classify_text(text: str) -> DocumentType:
+    """Guess the document type from its text, defaulting to invoice"""
+    match = _DOCUMENT_TITLE_RE.search(text)
+    return DocumentType(match.lastgroup) if match else DocumentType.INVOICE
+
+
+# The title is on the first page; one more covers a cover sheet
+_DETECTION_PAGES = (0, 2)
+
+
+def classify_pdf_text(pdf_content: bytes) -> Optional[DocumentType]:
+    """Guess the document type from a PDF's own text layer, None for scans"""
+    try:
+        text = extract_text_from_pdf(pdf_content, _DETECTION_PAGES)
+    except Exception:
+        return None
+    return _classify_text(text) if text.strip() else None
+
+
+# Currency symbols/codes and thousands separators stripped from table amounts
+_AMOUNT_STRIP_RE = re.compile(r"C\$|A\$|USD|EUR|GBP|JPY|CAD|AUD|[$€£¥,]")
+
+
+# Plain decimal numbers with optional thousands separators, e.g. "12", "1,250.50", ".5"
+_NUMBER_RE = re.compile(r"\s*-?(?:(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?|\.\d+)\s*")
+
+
+def _parse_number(text: str) -> Optional[float]:
+    """Parse a numeric table cell, None for headers, units and other text"""
+    # Matching first keeps non-numeric cells off the float() exception path
+    if _NUMBER_RE.fullmatch(text):
+        return float(text.replace(",", ""))
+    return None
+
+
+def _parse_amount(text: str) -> Optional[float]:
+    """Parse a table cell amount, ignoring currency symbols and separators"""
+    return _parse_number(_AMOUNT_STRIP_RE.sub("", text))
+
+
+def _table_rows(table: Any) -> List[List[Any]]:
+    """Group a table's cells by row in one pass, each row sorted by column"""
+    rows: List[List[Any]] = [[] for _ in range(table.row_count)]
+    for cell in table.cells:
+        rows[cell.row_index].append(cell)
+    for row in rows:
+        row.sort(key=lambda cell: cell.column_index)
+    return rows
+
+
+# Top-level invoice fields: (extracted_data key, Azure field name, coercion or None to keep as-is)
+_INVOICE_TOP_FIELDS = (
+    ("invoice_number", "InvoiceId", None),
+    ("po_number", "CustomerPurchaseOrder", str),
+    ("vendor_name", "VendorName", None),
+    ("date", "InvoiceDate", None),
+    ("subtotal", "SubTotal", _as_money),
+    ("due_date", "DueDate", None),
+)
+# Total amount fields in order of preference
+_INVOICE_TOTAL_FIELDS = ("AmountDue", "InvoiceTotal", "Total")
+
+# AddressValue attributes joined into the vendor address, in order
+_ADDRESS_PARTS = ("street_address", "city", "state", "postal_code")
+
+# Empty line items, copied per row
+_INVOICE_LINE_PROTO = {
+    "item_number": None,
+    "description": None,
+    "quantity": None,
+    "unit_price": None,
+    "line_total": None,
+}
+_DN_LINE_PROTO = {"item_number": None, "description": None, "quantity": None}
+
+# Invoice line item fields: (line_item key, Azure field name, coercion or None to keep as-is)
+_INVOICE_ITEM_FIELDS = (
+    ("item_number", "ProductCode", None),
+    ("description", "Description", None),
+    ("quantity", "Quantity", float),
+    ("unit_price", "UnitPrice", _as_money),
+    ("line_total", "Amount", _as_money),
+)
+
+
+def _parse_invoice_item(item: Any) -> Dict[str, Any]:
+    """Build a line item from an Azure Items entry"""
+    line_item = _INVOICE_LINE_PROTO.copy()
+
+    # Handle both dict-like and DocumentField objects
+    item_value = getattr(item, "value", item)
+    get = item_value.get if isinstance(
+        item_value, dict) else partial(getattr, item_value)
+
+    for out_key, field_name, coerce in _INVOICE_ITEM_FIELDS:
+        field = get(field_name, None)
+        if field is None:
+            continue
+        value = getattr(field, "value", field)
+        if coerce is None:
+            line_item[out_key] = value
+        elif value:
+            try:
+                line_item[out_key] = coerce(value)
+            except (ValueError, TypeError, AttributeError):
+                pass
+
+    return line_item
+
+
+def _parse_po_row(row_cells: List[Any]) -> Dict[str, Any]:
+    """Build a line item from a PO table row (item #, description, qty, unit price, total)"""
+    cell_count = len(row_cells)
+    item_cell, description_cell, quantity_cell = row_cells[:3]
+    line_item = _INVOICE_LINE_PROTO.copy()
+    line_item["item_number"] = item_cell.content.strip()
+    line_item["description"] = description_cell.content.strip()
+    line_item["quantity"] = _parse_number(quantity_cell.content)
+    if cell_count > 3:
+        line_item["unit_price"] = _parse_amount(row_cells[3].content)
+    if cell_count > 4:
+        line_item["line_total"] = _parse_amount(row_cells[4].content)
+    return line_item
+
+
+def _parse_dn_row(row_cells: List[Any]) -> Dict[str, Any]:
+    """Build a line item from a delivery note table row"""
+    line_item = _DN_LINE_PROTO.copy()
+    line_item["item_number"] = row_cells[0].content.strip()
+    line_item["description"] = row_cells[1].content.strip()
+
+    # Try to find quantity (could be in different columns)
+    for cell in row_cells[2:]:
+        qty = _parse_number(cell.content)
+        if qty is not None:
+            line_item["quantity"] = qty
+            break
+
+    return line_item
+
+
+class ExtractionCache(TTLCache["Future[Any]"]):
+    """Extraction futures by document type and content hash; a pending future is shared by
+    identical uploads arriving together (bursts, client retries), so they run one analysis"""
+
+    @staticmethod
+    def _copy(value: "Future[Any]") -> "Future[Any]":
+        # Futures are shared as is; their results are copied when read
+        return value
+
+
+def _resolved(extracted_data: Dict[str, Any]) -> "Future[Dict[str, Any]]":
+    future: "Future[Dict[str, Any]]" = Future()
+    future.set_result(extracted_data)
+    return future
+
+
 class FormRecognizerService:
     """Azure Form Recognizer service for document extraction"""
 
     def __init__(self):
-        self.client = DocumentAnalysisClient(
-            endpoint=settings.AZURE_FORM_RECOGNIZER_ENDPOINT,
-            credential=AzureKeyCredential(settings.AZURE_FORM_RECOGNIZER_KEY),
-        )
         self.llm_extractor = LLMExtractor()
         self.currency_extractor = CurrencyExtractor(self.llm_extractor)
         self.tax_extractor = TaxExtractor(self.llm_extractor)
+        # Duplicate uploads (resends, retries) reuse the previous analysis
+        self._cache = ExtractionCache(
+            settings.FORM_RECOGNIZER_CACHE_SIZE if settings.FORM_RECOGNIZER_CACHE_ENABLED else 0,
+            settings.FORM_RECOGNIZER_CACHE_TTL,
+        )
 
-    def analyze_invoice(self, file_content: bytes) -> Dict[str, Any]:
-        """Extract data from invoice using pre-built model"""
+    @cached_property
+    def client(self) -> DocumentAnalysisClient:
+        """Azure client, created on first analysis so importing this module stays cheap"""
+        return DocumentAnalysisClient(
+            endpoint=settings.AZURE_FORM_RECOGNIZER_ENDPOINT,
+            credential=AzureKeyCredential(settings.AZURE_FORM_RECOGNIZER_KEY),
+        )
+
+    def _extract_combined(
+        self, result: Any, extracted_data: Dict[str, Any], document_fields: Dict
+    ) -> Optional[CombinedExtraction]:
+        """Run one LLM request per document for currency, tax rate and tax validation"""
+        if not self.llm_extractor.enabled:
+            return None
+        # Only pay for the request when an extractor would fall back to the LLM;
+        # clean documents get currency and tax from the Azure fields alone
+        if not (
+            self.currency_extractor.needs_llm(result, document_fields)
+            or self.tax_extractor.needs_llm(document_fields, extracted_data)
+        ):
+            return None
+        document_text = "\n".join(filter(None, [
+            self.currency_extractor.collect_text_content(result, extracted_data),
+            self.tax_extractor.get_tax_relevant_text(result),
+        ]))
+        return self.llm_extractor.extract_all(
+            document_text,
+            tax_amount=self.tax_extractor.tax_amount_for_validation(document_fields, extracted_data),
+            subtotal=extracted_data.get("subtotal"),
+        )
+
+    def analyze_invoice(self, file_content: DocumentContent, result: Any = None) -> Dict[str, Any]:
+        """Extract data from invoice using pre-built model, reusing its result if one is given"""
         try:
-            poller = self.client.begin_analyze_document(
-                model_id="prebuilt-invoice",
-                document=file_content,
-            )
-            result = poller.result()
+            if result is None:
+                result = self.analyze_invoice_model(file_content)
 
             extracted_data = {
                 "invoice_number": None,
@@ -51,257 +317,123 @@ class FormRecognizerService:
             }
 
             # Extract fields from result
-            for idx, document in enumerate(result.documents):
-                if idx == 0:  # Primary document
-                    # Store document fields for later use
-                    primary_document_fields = document.fields
-                    # Extract invoice number
-                    if "InvoiceId" in document.fields:
-                        extracted_data["invoice_number"] = document.fields["InvoiceId"].value
-                        extracted_data["confidence_scores"]["invoice_number"] = document.fields["InvoiceId"].confidence
-
-                    # Extract PO number (if present on invoice)
-                    if "CustomerPurchaseOrder" in document.fields:
-                        po_value = document.fields["CustomerPurchaseOrder"].value
-                        if po_value:
-                            extracted_data["po_number"] = str(po_value)
-                            extracted_data["confidence_scores"]["po_number"] = document.fields["CustomerPurchaseOrder"].confidence
+            if result.documents:
+                document = result.documents[0]  # Primary document
+                fields = document.fields
+                confidence_scores = extracted_data["confidence_scores"]
+
+                # Invoice number, PO number (if present on invoice), vendor name, dates, subtotal
+                for out_key, field_name, coerce in _INVOICE_TOP_FIELDS:
+                    field = fields.get(field_name)
+                    if field is None or not field.value:
+                        continue
+                    extracted_data[out_key] = coerce(field.value) if coerce else field.value
+                    confidence_scores[out_key] = field.confidence
+
+                # Extract vendor address
+                field = fields.get("VendorAddress")
+                if field is not None and field.value:
+                    # AddressValue is an object with attributes, not a dict
+                    address_parts = [
+                        part for part in (
+                            getattr(field.value, attr, None) for attr in _ADDRESS_PARTS
+                        ) if part
+                    ]
+                    extracted_data["vendor_address"] = ", ".join(address_parts) or None
+                    confidence_scores["vendor_address"] = field.confidence
+
+                # Extract total amount - the first total field Azure returned
+                # (AmountDue is the most common, then InvoiceTotal, then Total)
+                field = next(
+                    (fields[name] for name in _INVOICE_TOTAL_FIELDS if name in fields), None)
+                if field is not None and field.value:
+                    extracted_data["total_amount"] = _as_money(field.value)
+                    if field.confidence is not None:
+                        confidence_scores["total_amount"] = field.confidence
+
+                # Currency, tax rate and tax validation from the LLM in one request
+                combined = self._extract_combined(result, extracted_data, fields)
+
+                # Extract currency using CurrencyExtractor (try before line items for Azure fields)
+                currency_code = self.currency_extractor.extract(
+                    azure_result=result,
+                    extracted_data=extracted_data,
+                    document_fields=fields,
+                    combined=combined,
+                )
+                if currency_code:
+                    extracted_data["currency_code"] = currency_code
+                    # Set confidence if available from CurrencyCode field
+                    if "CurrencyCode" in fields:
+                        confidence_scores["currency_code"] = fields["CurrencyCode"].confidence
+
+                # Extract and validate tax using TaxExtractor
+                tax_amount, tax_rate, tax_confidence = self.tax_extractor.extract_and_validate(
+                    document_fields=fields,
+                    extracted_data=extracted_data,
+                    azure_result=result,
+                    combined=combined,
+                )
+
+                if tax_amount is not None:
+                    extracted_data["tax_amount"] = tax_amount
+                    if tax_confidence is not None:
+                        confidence_scores["tax_amount"] = tax_confidence
+
+                if tax_rate is not None:
+                    extracted_data["tax_rate"] = tax_rate
+                    # Final fallback: Calculate tax rate if we have subtotal but no tax_rate yet
+                    if not extracted_data.get("tax_rate") and extracted_data.get("subtotal") and extracted_data["subtotal"] > 0 and tax_amount:
+                        extracted_data["tax_rate"] = (
+                            tax_amount / extracted_data["subtotal"]) * 100
 
-                    # Extract vendor name
-                    if "VendorName" in document.fields:
-                        extracted_data["vendor_name"] = document.fields["VendorName"].value
-                        extracted_data["confidence_scores"]["vendor_name"] = document.fields["VendorName"].confidence
-
-                    # Extract vendor address
-                    if "VendorAddress" in document.fields:
-                        vendor_address = document.fields["VendorAddress"].value
-                        if vendor_address:
-                            # AddressValue is an object with attributes, not a dict
-                            address_parts = []
-                            if hasattr(vendor_address, "street_address") and vendor_address.street_address:
-                                address_parts.append(
-                                    vendor_address.street_address)
-                            if hasattr(vendor_address, "city") and vendor_address.city:
-                                address_parts.append(vendor_address.city)
-                            if hasattr(vendor_address, "state") and vendor_address.state:
-                                address_parts.append(vendor_address.state)
-                            if hasattr(vendor_address, "postal_code") and vendor_address.postal_code:
-                                address_parts.append(
-                                    vendor_address.postal_code)
-                            extracted_data["vendor_address"] = ", ".join(
-                                address_parts) if address_parts else None
-                            extracted_data["confidence_scores"]["vendor_address"] = document.fields["VendorAddress"].confidence
-
-                    # Extract invoice date
-                    if "InvoiceDate" in document.fields:
-                        extracted_data["date"] = document.fields["InvoiceDate"].value
-                        extracted_data["confidence_scores"]["date"] = document.fields["InvoiceDate"].confidence
-
-                    # Extract total amount - try multiple fields Azure might use
-                    total_amount = None
-                    confidence = None
-
-                    # Try AmountDue first (most common)
-                    if "AmountDue" in document.fields:
-                        amount = document.fields["AmountDue"].value
-                        if amount:
-                            total_amount = float(amount.amount)
-                            confidence = document.fields["AmountDue"].confidence
-                    # Fallback to InvoiceTotal
-                    elif "InvoiceTotal" in document.fields:
-                        amount = document.fields["InvoiceTotal"].value
-                        if amount:
-                            total_amount = float(amount.amount)
-                            confidence = document.fields["InvoiceTotal"].confidence
-                    # Fallback to Total
-                    elif "Total" in document.fields:
-                        amount = document.fields["Total"].value
-                        if amount:
-                            total_amount = float(amount.amount)
-                            confidence = document.fields["Total"].confidence
-
-                    if total_amount is not None:
-                        extracted_data["total_amount"] = total_amount
-                        if confidence is not None:
-                            extracted_data["confidence_scores"]["total_amount"] = confidence
-
-                    # Extract currency using CurrencyExtractor (try before line items for Azure fields)
+                # Extract line items
+                if "Items" in fields:
+                    items = fields["Items"].value
+                    if items:
+                        # Currency extraction is handled by CurrencyExtractor
+                        extracted_data["line_items"] = [_parse_invoice_item(item) for item in items]
+
+                # Try currency extraction again after line items (for symbol inference fallback)
+                if not extracted_data.get("currency_code"):
                     currency_code = self.currency_extractor.extract(
                         azure_result=result,
                         extracted_data=extracted_data,
-                        document_fields=document.fields if idx == 0 else None,
+                        document_fields=fields,
+                        combined=combined,
                     )
                     if currency_code:
                         extracted_data["currency_code"] = currency_code
-                        # Set confidence if available from CurrencyCode field
-                        if "CurrencyCode" in document.fields:
-                            extracted_data["confidence_scores"]["currency_code"] = document.fields["CurrencyCode"].confidence
-
-                    # Extract subtotal
-                    if "SubTotal" in document.fields:
-                        subtotal_field = document.fields["SubTotal"].value
-                        if subtotal_field:
-                            extracted_data["subtotal"] = float(
-                                subtotal_field.amount)
-                            extracted_data["confidence_scores"]["subtotal"] = document.fields["SubTotal"].confidence
-
-                    # Extract and validate tax using TaxExtractor
-                    tax_amount, tax_rate, tax_confidence = self.tax_extractor.extract_and_validate(
-                        document_fields=document.fields,
-                        extracted_data=extracted_data,
-                        azure_result=result,
-                    )
-
-                    if tax_amount is not None:
-                        extracted_data["tax_amount"] = tax_amount
-                        if tax_confidence is not None:
-                            extracted_data["confidence_scores"]["tax_amount"] = tax_confidence
-
-                    if tax_rate is not None:
-                        extracted_data["tax_rate"] = tax_rate
-                        # Final fallback: Calculate tax rate if we have subtotal but no tax_rate yet
-                        if not extracted_data.get("tax_rate") and extracted_data.get("subtotal") and extracted_data["subtotal"] > 0 and tax_amount:
-                            extracted_data["tax_rate"] = (
-                                tax_amount / extracted_data["subtotal"]) * 100
-
-                    # Extract due date
-                    if "DueDate" in document.fields:
-                        due_date = document.fields["DueDate"].value
-                        if due_date:
-                            extracted_data["due_date"] = due_date
-                            extracted_data["confidence_scores"]["due_date"] = document.fields["DueDate"].confidence
-
-                    # Extract line items
-                    if "Items" in document.fields:
-                        items = document.fields["Items"].value
-                        if items:
-                            for item in items:
-                                line_item = {
-                                    "item_number": None,
-                                    "description": None,
-                                    "quantity": None,
-                                    "unit_price": None,
-                                    "line_total": None,
-                                }
-
-                                # Handle both dict-like and DocumentField objects
-                                item_value = item.value if hasattr(
-                                    item, "value") else item
-
-                                # ProductCode/ItemNumber (Azure may extract this)
-                                if isinstance(item_value, dict) and "ProductCode" in item_value:
-                                    product_code = item_value["ProductCode"]
-                                    line_item["item_number"] = product_code.value if hasattr(
-                                        product_code, "value") else product_code
-                                elif hasattr(item_value, "ProductCode"):
-                                    product_code = item_value.ProductCode
-                                    line_item["item_number"] = product_code.value if hasattr(
-                                        product_code, "value") else product_code
-
-                                # Description
-                                if isinstance(item_value, dict) and "Description" in item_value:
-                                    desc_field = item_value["Description"]
-                                    line_item["description"] = desc_field.value if hasattr(
-                                        desc_field, "value") else desc_field
-                                elif hasattr(item_value, "Description"):
-                                    desc_field = item_value.Description
-                                    line_item["description"] = desc_field.value if hasattr(
-                                        desc_field, "value") else desc_field
-
-                                # Quantity
-                                if isinstance(item_value, dict) and "Quantity" in item_value:
-                                    qty_field = item_value["Quantity"]
-                                    qty = qty_field.value if hasattr(
-                                        qty_field, "value") else qty_field
-                                    if qty:
-                                        try:
-                                            line_item["quantity"] = float(qty)
-                                        except (ValueError, TypeError):
-                                            pass
-                                elif hasattr(item_value, "Quantity"):
-                                    qty_field = item_value.Quantity
-                                    qty = qty_field.value if hasattr(
-                                        qty_field, "value") else qty_field
-                                    if qty:
-                                        try:
-                                            line_item["quantity"] = float(qty)
-                                        except (ValueError, TypeError):
-                                            pass
-
-                                # Unit Price
-                                if isinstance(item_value, dict) and "UnitPrice" in item_value:
-                                    price_field = item_value["UnitPrice"]
-                                    price = price_field.value if hasattr(
-                                        price_field, "value") else price_field
-                                    if price:
-                                        try:
-                                            line_item["unit_price"] = float(price.amount) if hasattr(
-                                                price, "amount") else float(price)
-                                            # Currency extraction is handled by CurrencyExtractor
-                                        except (ValueError, TypeError, AttributeError):
-                                            pass
-                                elif hasattr(item_value, "UnitPrice"):
-                                    price_field = item_value.UnitPrice
-                                    price = price_field.value if hasattr(
-                                        price_field, "value") else price_field
-                                    if price:
-                                        try:
-                                            line_item["unit_price"] = float(price.amount) if hasattr(
-                                                price, "amount") else float(price)
-                                            # Currency extraction is handled by CurrencyExtractor
-                                        except (ValueError, TypeError, AttributeError):
-                                            pass
-
-                                # Amount (line total)
-                                if isinstance(item_value, dict) and "Amount" in item_value:
-                                    amount_field = item_value["Amount"]
-                                    amount = amount_field.value if hasattr(
-                                        amount_field, "value") else amount_field
-                                    if amount:
-                                        try:
-                                            line_item["line_total"] = float(amount.amount) if hasattr(
-                                                amount, "amount") else float(amount)
-                                            # Currency extraction is handled by CurrencyExtractor
-                                        except (ValueError, TypeError, AttributeError):
-                                            pass
-                                elif hasattr(item_value, "Amount"):
-                                    amount_field = item_value.Amount
-                                    amount = amount_field.value if hasattr(
-                                        amount_field, "value") else amount_field
-                                    if amount:
-                                        try:
-                                            line_item["line_total"] = float(amount.amount) if hasattr(
-                                                amount, "amount") else float(amount)
-                                            # Currency extraction is handled by CurrencyExtractor
-                                        except (ValueError, TypeError, AttributeError):
-                                            pass
-
-                                extracted_data["line_items"].append(line_item)
-
-                    # Try currency extraction again after line items (for symbol inference fallback)
-                    if not extracted_data.get("currency_code"):
-                        currency_code = self.currency_extractor.extract(
-                            azure_result=result,
-                            extracted_data=extracted_data,
-                            document_fields=primary_document_fields,
-                        )
-                        if currency_code:
-                            extracted_data["currency_code"] = currency_code
 
             return extracted_data
 
         except Exception as e:
             raise Exception(f"Failed to analyze invoice: {str(e)}")
 
-    def analyze_purchase_order(self, file_content: bytes) -> Dict[str, Any]:
-        """Extract data from purchase order using pre-built model"""
+    def analyze_invoice_model(self, file_content: DocumentContent) -> Any:
+        """Run the pre-built invoice model"""
+        _validate_content(file_content)
+        poller = self.client.begin_analyze_document(
+            model_id="prebuilt-invoice",
+            document=_rewind(file_content),
+        )
+        return poller.result()
+
+    def analyze_layout(self, file_content: DocumentContent) -> Any:
+        """Run the general layout model (used for documents without a pre-built model)"""
+        _validate_content(file_content)
+        poller = self.client.begin_analyze_document(
+            model_id="prebuilt-layout",
+            document=_rewind(file_content),
+        )
+        return poller.result()
+
+    def analyze_purchase_order(self, file_content: DocumentContent, result: Any = None) -> Dict[str, Any]:
+        """Extract data from purchase order, reusing a layout result if one is given"""
         try:
             # Use general document model for PO (no pre-built PO model)
-            poller = self.client.begin_analyze_document(
-                model_id="prebuilt-layout",
-                document=file_content,
-            )
-            result = poller.result()
+            if result is None:
+                result = self.analyze_layout(file_content)
 
             extracted_data = {
                 "po_number": None,
@@ -322,11 +454,10 @@ class FormRecognizerService:
                 paragraphs = result.paragraphs
                 for i, para in enumerate(paragraphs):
                     content = para.content.strip()
-                    content_lower = content.lower()
 
                     # Extract PO number
                     if not extracted_data["po_number"]:
-                        if "po number:" in content_lower or "purchase order:" in content_lower:
+                        if _PO_NUMBER_LABEL_RE.search(content):
                             # Next paragraph should be the PO number
                             if i + 1 < len(paragraphs):
                                 next_para = paragraphs[i + 1].content.strip()
@@ -335,7 +466,7 @@ class FormRecognizerService:
 
                     # Extract vendor name
                     if not extracted_data["vendor_name"]:
-                        if "vendor:" in content_lower:
+                        if _PO_VENDOR_LABEL_RE.search(content):
                             # Next paragraph should be the vendor name
                             if i + 1 < len(paragraphs):
                                 next_para = paragraphs[i + 1].content.strip()
@@ -365,65 +496,11 @@ class FormRecognizerService:
             # Extract from tables (line items)
             if hasattr(result, "tables"):
                 for table in result.tables:
-                    # Skip header row (row_index 0)
-                    for row_idx in range(1, table.row_count):
-                        row_cells = [
-                            cell for cell in table.cells if cell.row_index == row_idx]
-                        if len(row_cells) >= 3:  # At least item #, description, qty
-                            # Sort by column index
-                            row_cells.sort(key=lambda x: x.column_index)
-
-                            line_item = {
-                                "item_number": row_cells[0].content.strip() if len(row_cells) > 0 else None,
-                                "description": row_cells[1].content.strip() if len(row_cells) > 1 else None,
-                                "quantity": None,
-                                "unit_price": None,
-                                "line_total": None,
-                            }
-
-                            # Try to parse quantities and prices
-                            if len(row_cells) > 2:
-                                try:
-                                    qty_str = row_cells[2].content.strip()
-                                    line_item["quantity"] = float(qty_str)
-                                except (ValueError, IndexError):
-                                    pass
-
-                            if len(row_cells) > 3:
-                                try:
-                                    # Remove all currency symbols and formatting
-                                    price_str = row_cells[3].content
-                                    # Remove common currency symbols
-                                    for symbol in ["$", "€", "£", "¥", "C$", "A$", "USD", "EUR", "GBP", "JPY", "CAD", "AUD"]:
-                                        price_str = price_str.replace(
-                                            symbol, "")
-                                    # Remove commas and whitespace
-                                    price_str = price_str.replace(
-                                        ",", "").strip()
-                                    if price_str:
-                                        line_item["unit_price"] = float(
-                                            price_str)
-                                except (ValueError, IndexError, AttributeError):
-                                    pass
-
-                            if len(row_cells) > 4:
-                                try:
-                                    # Remove all currency symbols and formatting
-                                    total_str = row_cells[4].content
-                                    # Remove common currency symbols
-                                    for symbol in ["$", "€", "£", "¥", "C$", "A$", "USD", "EUR", "GBP", "JPY", "CAD", "AUD"]:
-                                        total_str = total_str.replace(
-                                            symbol, "")
-                                    # Remove commas and whitespace
-                                    total_str = total_str.replace(
-                                        ",", "").strip()
-                                    if total_str:
-                                        line_item["line_total"] = float(
-                                            total_str)
-                                except (ValueError, IndexError, AttributeError):
-                                    pass
-
-                            extracted_data["line_items"].append(line_item)
+                    # Skip header row (row_index 0); need at least item #, description, qty
+                    extracted_data["line_items"].extend(
+                        _parse_po_row(row_cells)
+                        for row_cells in _table_rows(table)[1:] if len(row_cells) >= 3
+                    )
 
             # ============================================================
             # PHASE 1: GROUND TRUTH - Calculate subtotal from line items
@@ -447,59 +524,36 @@ class FormRecognizerService:
             # ============================================================
             # Extract subtotal and total from tables (currency and tax handled by extractors)
             if hasattr(result, "tables"):
-                import re
                 for table in result.tables:
-                    for row_idx in range(table.row_count):
-                        row_cells = [
-                            cell for cell in table.cells if cell.row_index == row_idx]
+                    for row_cells in _table_rows(table):
                         if len(row_cells) >= 2:
-                            row_cells.sort(key=lambda x: x.column_index)
                             label = row_cells[0].content.strip().lower()
-                            value_str = row_cells[1].content.strip() if len(
-                                row_cells) > 1 else ""
+                            value_str = row_cells[1].content
 
                             # Extract subtotal from table
                             if not extracted_data["subtotal"] and "subtotal" in label:
-                                try:
-                                    # Remove currency symbols (extractors handle currency)
-                                    for symbol in ["$", "€", "£", "¥", "C$", "A$", "USD", "EUR", "GBP", "JPY", "CAD", "AUD"]:
-                                        value_str = value_str.replace(
-                                            symbol, "")
-                                    value_str = value_str.replace(
-                                        ",", "").strip()
-                                    if value_str:
-                                        table_subtotal = float(value_str)
-                                        # Validate against calculated (if available)
-                                        if calculated_subtotal:
-                                            # 1% tolerance
-                                            if abs(table_subtotal - calculated_subtotal) / calculated_subtotal < 0.01:
-                                                extracted_data["subtotal"] = table_subtotal
-                                        else:
+                                # Currency symbols are stripped (extractors handle currency)
+                                table_subtotal = _parse_amount(value_str)
+                                if table_subtotal is not None:
+                                    # Validate against calculated (if available)
+                                    if calculated_subtotal:
+                                        # 1% tolerance
+                                        if abs(table_subtotal - calculated_subtotal) / calculated_subtotal < 0.01:
                                             extracted_data["subtotal"] = table_subtotal
-                                except (ValueError, IndexError):
-                                    pass
+                                    else:
+                                        extracted_data["subtotal"] = table_subtotal
 
                             # Extract total from table
                             if not extracted_data["total_amount"] and "total" in label and "subtotal" not in label:
-                                try:
-                                    # Remove currency symbols (extractors handle currency)
-                                    for symbol in ["$", "€", "£", "¥", "C$", "A$", "USD", "EUR", "GBP", "JPY", "CAD", "AUD"]:
-                                        value_str = value_str.replace(
-                                            symbol, "")
-                                    value_str = value_str.replace(
-                                        ",", "").strip()
-                                    if value_str:
-                                        extracted_data["total_amount"] = float(
-                                            value_str)
-                                except (ValueError, IndexError):
-                                    pass
+                                table_total = _parse_amount(value_str)
+                                if table_total is not None:
+                                    extracted_data["total_amount"] = table_total
 
             # ============================================================
             # PHASE 3: LLM-Enhanced Extraction from Paragraphs
             # ============================================================
             # Use LLM for complex cases where paragraphs are combined
             if hasattr(result, "paragraphs"):
-                import re
                 paragraphs = result.paragraphs
                 paragraph_texts = [para.content.strip() for para in paragraphs]
 
@@ -575,11 +629,15 @@ class FormRecognizerService:
             # ============================================================
             # PHASE 4: Extract currency and tax using extractors
             # ============================================================
+            # Currency, tax rate and tax validation from the LLM in one request
+            combined = self._extract_combined(result, extracted_data, {})
+
             # Extract currency using CurrencyExtractor (after line items for symbol inference)
             currency_code = self.currency_extractor.extract(
                 azure_result=result,
                 extracted_data=extracted_data,
                 document_fields=None,  # PO doesn't have Azure document fields
+                combined=combined,
             )
             if currency_code:
                 extracted_data["currency_code"] = currency_code
@@ -591,6 +649,7 @@ class FormRecognizerService:
                 document_fields={},  # PO doesn't have Azure fields
                 extracted_data=extracted_data,
                 azure_result=result,
+                combined=combined,
             )
 
             if tax_amount is not None:
@@ -618,14 +677,11 @@ class FormRecognizerService:
         except Exception as e:
             raise Exception(f"Failed to analyze purchase order: {str(e)}")
 
-    def analyze_delivery_note(self, file_content: bytes) -> Dict[str, Any]:
-        """Extract data from delivery note using general layout model"""
+    def analyze_delivery_note(self, file_content: DocumentContent, result: Any = None) -> Dict[str, Any]:
+        """Extract data from delivery note, reusing a layout result if one is given"""
         try:
-            poller = self.client.begin_analyze_document(
-                model_id="prebuilt-layout",
-                document=file_content,
-            )
-            result = poller.result()
+            if result is None:
+                result = self.analyze_layout(file_content)
 
             extracted_data = {
                 "delivery_note_number": None,
@@ -642,20 +698,19 @@ class FormRecognizerService:
                 paragraphs = result.paragraphs
                 for i, para in enumerate(paragraphs):
                     content = para.content.strip()
-                    content_lower = content.lower()
 
                     # Extract delivery note number
                     if not extracted_data["delivery_note_number"]:
-                        if "delivery note" in content_lower or "dn" in content_lower:
+                        if _DN_NUMBER_LABEL_RE.search(content):
                             # Next paragraph should be the DN number
                             if i + 1 < len(paragraphs):
                                 next_para = paragraphs[i + 1].content.strip()
-                                if next_para and not next_para.endswith(":") and ("DN-" in next_para or "dn-" in next_para.lower()):
+                                if next_para and not next_para.endswith(":") and _DN_NUMBER_RE.search(next_para):
                                     extracted_data["delivery_note_number"] = next_para
 
                     # Extract PO number
                     if not extracted_data["po_number"]:
-                        if "po number:" in content_lower:
+                        if _DN_PO_NUMBER_LABEL_RE.search(content):
                             # Next paragraph should be the PO number
                             if i + 1 < len(paragraphs):
                                 next_para = paragraphs[i + 1].content.strip()
@@ -664,7 +719,7 @@ class FormRecognizerService:
 
                     # Extract vendor name
                     if not extracted_data["vendor_name"]:
-                        if "from:" in content_lower:
+                        if _DN_VENDOR_LABEL_RE.search(content):
                             # Next paragraph should be the vendor name
                             if i + 1 < len(paragraphs):
                                 next_para = paragraphs[i + 1].content.strip()
@@ -674,46 +729,110 @@ class FormRecognizerService:
             # Extract line items from tables
             if hasattr(result, "tables"):
                 for table in result.tables:
-                    # Skip header row (row_index 0)
-                    for row_idx in range(1, table.row_count):
-                        row_cells = [
-                            cell for cell in table.cells if cell.row_index == row_idx]
-                        if len(row_cells) >= 2:  # At least item # and description
-                            # Sort by column index
-                            row_cells.sort(key=lambda x: x.column_index)
-
-                            line_item = {
-                                "item_number": row_cells[0].content.strip() if len(row_cells) > 0 else None,
-                                "description": row_cells[1].content.strip() if len(row_cells) > 1 else None,
-                                "quantity": None,
-                            }
-
-                            # Try to find quantity (could be in different columns)
-                            for cell in row_cells[2:]:
-                                try:
-                                    qty = float(cell.content.strip())
-                                    line_item["quantity"] = qty
-                                    break
-                                except (ValueError, TypeError):
-                                    pass
-
-                            extracted_data["line_items"].append(line_item)
+                    # Skip header row (row_index 0); need at least item # and description
+                    extracted_data["line_items"].extend(
+                        _parse_dn_row(row_cells)
+                        for row_cells in _table_rows(table)[1:] if len(row_cells) >= 2
+                    )
 
             return extracted_data
 
         except Exception as e:
             raise Exception(f"Failed to analyze delivery note: {str(e)}")
 
-    def extract_document(self, document_type: DocumentType, file_content: bytes) -> Dict[str, Any]:
-        """Extract data based on document type"""
+    @staticmethod
+    def _cache_key(
+        document_type: DocumentType, file_content: DocumentContent, content_hash: Optional[str]
+    ) -> Tuple[str, str]:
+        return DocumentType(document_type).value, content_hash or hash_content(file_content)
+
+    def _coalesced(self, key: Tuple[str, str], compute: Callable[[], Any]) -> Any:
+        """Run compute once per key; identical calls, concurrent or later, share its result"""
+        pending: "Future[Any]" = Future()
+        cached = self._cache.setdefault(key, pending)
+        if cached is not pending:
+            # Finished or still running for an identical upload
+            return copy.deepcopy(cached.result())
+
+        try:
+            value = compute()
+            pending.set_result(value)
+        except BaseException as e:
+            # Failures are not cached; callers already waiting get the same error
+            self._cache.discard(key, pending)
+            pending.set_exception(e)
+            raise
+        return copy.deepcopy(value)
+
+    def extract_document(
+        self,
+        document_type: DocumentType,
+        file_content: DocumentContent,
+        content_hash: Optional[str] = None,
+        load_previous: Optional[Callable[[], Optional[Tuple[DocumentType, Dict[str, Any]]]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Extract data based on document type, reusing the result for identical content.
+
+        On a cache miss, load_previous is tried before analyzing, so a caller can supply the
+        (document type, data) of an extraction it persisted earlier for the same content hash.
+        """
+        def extract() -> Dict[str, Any]:
+            previous = load_previous() if load_previous else None
+            if previous is not None:
+                return previous[1]
+            return self._extract_document(document_type, file_content)
+
+        return self._coalesced(self._cache_key(document_type, file_content, content_hash), extract)
+
+    def _extract_document(
+        self, document_type: DocumentType, file_content: DocumentContent, result: Any = None
+    ) -> Dict[str, Any]:
+        """Extract data based on document type, reusing an analysis result if one is given"""
         if document_type == DocumentType.INVOICE:
-            return self.analyze_invoice(file_content)
+            return self.analyze_invoice(file_content, result)
         elif document_type == DocumentType.PURCHASE_ORDER:
-            return self.analyze_purchase_order(file_content)
+            return self.analyze_purchase_order(file_content, result)
         elif document_type == DocumentType.DELIVERY_NOTE:
-            return self.analyze_delivery_note(file_content)
+            return self.analyze_delivery_note(file_content, result)
         else:
             raise ValueError(f"Unsupported document type: {document_type}")
 
+    def extract_document_auto(
+        self,
+        file_content: DocumentContent,
+        content_hash: Optional[str] = None,
+        load_previous: Optional[Callable[[], Optional[Tuple[DocumentType, Dict[str, Any]]]]] = None,
+    ) -> Tuple[DocumentType, Dict[str, Any]]:
+        """
+        Detect the document type and extract its data with at most one Azure analysis.
+
+        For uploads whose type cannot be read locally (scans, DOCX; text PDFs go through
+        classify_pdf_text and extract_document). Results are reused like extract_document's.
+        """
+        content_hash = content_hash or hash_content(file_content)
+
+        def extract() -> Tuple[DocumentType, Dict[str, Any]]:
+            previous = load_previous() if load_previous else None
+            if previous is not None:
+                document_type, extracted_data = previous
+            else:
+                # Most uploads are invoices, so run the invoice model; its result also carries
+                # the page text, paragraphs and tables that the PO and DN parsers read
+                result = self.analyze_invoice_model(file_content)
+                document_type = _classify_text(result.content or "")
+                extracted_data = self._extract_document(document_type, file_content, result)
+            # Later uploads of the same content with the type given reuse it as well
+            self._cache.setdefault(
+                self._cache_key(document_type, file_content, content_hash),
+                _resolved(copy.deepcopy(extracted_data)),
+            )
+            return document_type, extracted_data
+
+        return self._coalesced(("auto", content_hash), extract)
+
 
-form_recognizer_service = FormRecognizerService()
+@lru_cache(maxsize=1)
+def get_form_recognizer_service() -> FormRecognizerService:
+    """Process-wide service, created on first use"""
+    return FormRecognizerService()
@@ -4,13 +4,121 @@ LLM-Enhanced Extraction Service using Instructor for Structured Outputs
 Provides context-aware extraction and validation for financial document fields,
 especially for complex cases where regex-based extraction fails.
 """
-from typing import Optional
-from pydantic import BaseModel, Field
+from typing import Optional, Type, TypeVar
+from pydantic import BaseModel, Field, PrivateAttr
+import hashlib
 import instructor
 from openai import OpenAI
 
 from src.core.config import settings
+from src.services.cache import TTLCache
 
+# Bump when prompts or response schemas change so cached responses are not reused
+PROMPT_VERSION = "2"
+
+ResponseModel = TypeVar("ResponseModel", bound=BaseModel)
+
+# Static instructions live in the system messages and the per-document text in the user
+# message, so every request shares a byte-identical prefix for OpenAI's automatic prompt
+# caching. Keep these free of timestamps or other per-request content.
+TAX_SYSTEM_PROMPT = """You are a financial document extraction expert. Extract tax information accurately and distinguish between tax amounts and total amounts.
+
+Extract tax information from the financial document text given by the user.
+
+Instructions:
+1. Look for tax rate percentage in patterns like:
+   - "Tax (8%):"
+   - "8% Tax"
+   - "Tax Rate: 8%"
+   - "VAT 20%"
+   
+2. Extract tax rate as a percentage number (e.g., 8.0 for 8%, NOT 0.08)
+
+3. If you see a tax amount, extract it (e.g., "$160.00" → 160.0)
+   - Make sure it's the TAX amount, not the TOTAL amount
+   - If you see "Tax (8%): $160.00 Total: $2,160.00", the tax amount is 160.00, NOT 2160.00
+
+4. Be careful to distinguish:
+   - Tax amount (what we want)
+   - Total amount (what we DON'T want)
+   - Subtotal (what we DON'T want)
+
+Return structured data with confidence score."""
+
+CURRENCY_SYSTEM_PROMPT = """You are a financial document extraction expert. Extract the primary currency code accurately.
+
+Extract the ISO 4217 currency code (e.g., USD, EUR, GBP) from the financial document text given by the user.
+
+Instructions:
+1. Look for currency symbols like '$', '€', '£'.
+2. Look for currency codes like 'USD', 'EUR', 'GBP', 'JPY', 'CAD', 'AUD'.
+3. Prioritize explicit codes over symbols if both are present.
+4. If multiple currencies are mentioned, extract the primary currency of the document (e.g., associated with total amounts).
+5. Return only the 3-letter ISO code (e.g., "USD", "EUR").
+
+Return structured data with confidence score and reasoning."""
+
+TOTALS_SYSTEM_PROMPT = """You are a financial document extraction expert. Accurately extract subtotal, tax rate, tax amount, and total amount, distinguishing between them carefully.
+
+Extract financial totals from the purchase order text sections given by the user.
+
+Instructions:
+1. Extract subtotal (amount before tax)
+2. Extract tax rate as percentage (e.g., 8.0 for 8%)
+3. Extract tax amount (the tax value itself, NOT the total)
+4. Extract total amount (final amount including tax)
+
+Be very careful to distinguish:
+- Subtotal: Base amount before tax
+- Tax Rate: Percentage (e.g., 8% = 8.0)
+- Tax Amount: The tax value (e.g., if subtotal is 2000 and tax is 8%, tax amount is 160)
+- Total Amount: Subtotal + Tax Amount
+
+If text is ambiguous or combined (e.g., "Subtotal: $2,000.00 Tax (8%): $160.00 Total: $2,160.00"),
+correctly identify each value based on its label.
+
+Return structured data with confidence scores."""
+
+VALIDATION_SYSTEM_PROMPT = """You are a financial data validation expert. Distinguish between extraction errors and real document discrepancies.
+
+You are validating financial data extraction accuracy. The user gives the extracted and calculated values and the relevant document text.
+
+Question: Is the difference between extracted and calculated tax amounts:
+1. An EXTRACTION ERROR (we picked the wrong number from document)?
+   - Example: Extracted the "Total" amount instead of "Tax" amount
+   - Example: Picked a number from wrong line
+   
+2. A REAL DOCUMENT DISCREPANCY (document has calculation error)?
+   - Example: Document shows wrong tax calculation
+   - Example: Document has typo
+   
+3. ACCEPTABLE ROUNDING (small difference due to rounding)?
+   - Example: Difference < 1% of subtotal
+
+Consider:
+- If extracted amount equals the "Total" line value → extraction error
+- If extracted amount is very close to calculated (±1%) → rounding
+- If extracted amount is very different → likely extraction error (picked wrong number)
+
+Return structured validation result."""
+
+COMBINED_SYSTEM_PROMPT = """You are a financial document extraction expert. Extract currency and tax information accurately and distinguish between tax amounts and total amounts.
+
+Extract the following from the financial document text given by the user.
+
+Instructions:
+1. Currency: the primary ISO 4217 code (e.g., USD, EUR, GBP, JPY, CAD, AUD).
+   Prioritize explicit codes over symbols ('$', '€', '£'); prefer the currency of the total amounts.
+2. Tax: the tax rate as a percentage (e.g., 8.0 for 8%, NOT 0.08) from patterns like "Tax (8%):",
+   "8% Tax", "VAT 20%", and the tax amount. Make sure the tax amount is the TAX, not the total or subtotal.
+3. Tax validation: only if the user gives an extracted tax amount and a subtotal.
+   Using the tax rate you found (or the rate implied by the document), decide whether the extracted amount is:
+   - an EXTRACTION ERROR (we picked the wrong number, e.g. the "Total" line instead of "Tax"),
+   - a REAL DOCUMENT DISCREPANCY (the document's own tax calculation is wrong), or
+   - ACCEPTABLE ROUNDING (difference < 1% of subtotal, not an extraction error).
+   Fill tax_validation, with recommended_value set to the tax amount to use; otherwise leave it empty.
+
+Return structured data with confidence scores and reasoning for each part."""
 
 class TaxExtraction(BaseModel):
     """Structured tax information extraction"""
@@ -93,6 +201,47 @@ class ValidationResult(BaseModel):
     )
 
 
+class CombinedExtraction(BaseModel):
+    """Currency, tax and tax validation for one document, extracted in a single request"""
+    currency: CurrencyExtraction = Field(
+        default_factory=CurrencyExtraction,
+        description="Primary currency of the document"
+    )
+    tax: TaxExtraction = Field(
+        default_factory=TaxExtraction,
+        description="Tax rate and tax amount stated in the document"
+    )
+    tax_validation: Optional[ValidationResult] = Field(
+        None,
+        description="Validation of the extracted tax amount; only filled when an extracted tax amount and subtotal are given"
+    )
+    # (tax_amount, subtotal) the validation was requested for; not part of the LLM schema
+    _validated_for: Optional[tuple[float, float]] = PrivateAttr(default=None)
+
+    def validation_for(self, tax_amount: float, subtotal: float) -> Optional[ValidationResult]:
+        """Return the tax validation if it was requested for these exact values"""
+        if self._validated_for == (tax_amount, subtotal):
+            return self.tax_validation
+        return None
+
+
+class LLMResponseCache(TTLCache[BaseModel]):
+    """In-memory LRU cache of structured LLM responses with a TTL"""
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """SHA256 over the prompt version and the request parts"""
+        digest = hashlib.sha256(PROMPT_VERSION.encode())
+        for part in parts:
+            digest.update(b"\0")
+            digest.update(part.encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _copy(value: BaseModel) -> BaseModel:
+        return value.model_copy(deep=True)
+
+
 class LLMExtractor:
     """LLM-powered extraction service using Instructor for structured outputs"""
 
@@ -104,6 +253,27 @@ class LLMExtractor:
             self.client = instructor.patch(
                 OpenAI(api_key=settings.OPENAI_API_KEY))
             self.enabled = settings.USE_LLM_FOR_EXTRACTION
+        self.cache = LLMResponseCache(settings.LLM_CACHE_SIZE, settings.LLM_CACHE_TTL)
+
+    def _complete(self, response_model: Type[ResponseModel], system_prompt: str, prompt: str) -> ResponseModel:
+        """Run a structured completion, reusing the cached response for an identical request"""
+        key = LLMResponseCache.make_key(
+            settings.OPENAI_MODEL, response_model.__name__, system_prompt, prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        response = self.client.chat.completions.create(
+            model=settings.OPENAI_MODEL,
+            response_model=response_model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.0,  # Deterministic extraction
+        )
+        self.cache.set(key, response)
+        return response
 
     def extract_tax_rate(self, text_content: str) -> Optional[TaxExtraction]:
         """
@@ -119,39 +289,7 @@ class LLMExtractor:
             return None
 
         try:
-            prompt = f"""Extract tax information from this financial document text.
-
-Text: {text_content}
-
-Instructions:
-1. Look for tax rate percentage in patterns like:
-   - "Tax (8%):"
-   - "8% Tax"
-   - "Tax Rate: 8%"
-   - "VAT 20%"
-   
-2. Extract tax rate as a percentage number (e.g., 8.0 for 8%, NOT 0.08)
-
-3. If you see a tax amount, extract it (e.g., "$160.00" → 160.0)
-   - Make sure it's the TAX amount, not the TOTAL amount
-   - If you see "Tax (8%): $160.00 Total: $2,160.00", the tax amount is 160.00, NOT 2160.00
-
-4. Be careful to distinguish:
-   - Tax amount (what we want)
-   - Total amount (what we DON'T want)
-   - Subtotal (what we DON'T want)
-
-Return structured data with confidence score."""
-
-            response = self.client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                response_model=TaxExtraction,
-                messages=[
-                    {"role": "system", "content": "You are a financial document extraction expert. Extract tax information accurately and distinguish between tax amounts and total amounts."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.0,  # Deterministic extraction
-            )
+            response = self._complete(TaxExtraction, TAX_SYSTEM_PROMPT, f"Text: {text_content}")
 
             return response
 
@@ -173,28 +311,45 @@ Return structured data with confidence score."""
             return None
 
         try:
-            prompt = f"""Extract the ISO 4217 currency code (e.g., USD, EUR, GBP) from the following financial document text.
+            response = self._complete(CurrencyExtraction, CURRENCY_SYSTEM_PROMPT, f"Text: {text_content}")
 
-Text: {text_content}
+            return response
 
-Instructions:
-1. Look for currency symbols like '$', '€', '£'.
-2. Look for currency codes like 'USD', 'EUR', 'GBP', 'JPY', 'CAD', 'AUD'.
-3. Prioritize explicit codes over symbols if both are present.
-4. If multiple currencies are mentioned, extract the primary currency of the document (e.g., associated with total amounts).
-5. Return only the 3-letter ISO code (e.g., "USD", "EUR").
+        except Exception as e:
+            return None
 
-Return structured data with confidence score and reasoning."""
+    def extract_all(
+        self,
+        text_content: str,
+        tax_amount: Optional[float] = None,
+        subtotal: Optional[float] = None,
+    ) -> Optional[CombinedExtraction]:
+        """
+        Extract currency and tax rate, and validate the extracted tax amount, in one request.
 
-            response = self.client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                response_model=CurrencyExtraction,
-                messages=[
-                    {"role": "system", "content": "You are a financial document extraction expert. Extract the primary currency code accurately."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.0,
-            )
+        Args:
+            text_content: Document text (paragraphs, fields, line items)
+            tax_amount: Tax amount extracted so far, to validate (optional)
+            subtotal: Subtotal amount, required to validate tax_amount (optional)
+
+        Returns:
+            CombinedExtraction, or None if LLM not available or the request failed
+            (callers then fall back to the per-field methods)
+        """
+        if not self.enabled or not self.client or not text_content:
+            return None
+
+        validate = tax_amount is not None and bool(subtotal)
+        prompt = f"Text: {text_content}"
+        if validate:
+            prompt += f"\n\nExtracted tax amount: {tax_amount}\nSubtotal: {subtotal}"
+
+        try:
+            response = self._complete(CombinedExtraction, COMBINED_SYSTEM_PROMPT, prompt)
+            if validate:
+                response._validated_for = (tax_amount, subtotal)
+            else:
+                response.tax_validation = None
 
             return response
 
@@ -224,37 +379,8 @@ Return structured data with confidence score and reasoning."""
             if not relevant_text:
                 return None
 
-            prompt = f"""Extract financial totals from this purchase order document.
-
-Text sections:
-{relevant_text}
-
-Instructions:
-1. Extract subtotal (amount before tax)
-2. Extract tax rate as percentage (e.g., 8.0 for 8%)
-3. Extract tax amount (the tax value itself, NOT the total)
-4. Extract total amount (final amount including tax)
-
-Be very careful to distinguish:
-- Subtotal: Base amount before tax
-- Tax Rate: Percentage (e.g., 8% = 8.0)
-- Tax Amount: The tax value (e.g., if subtotal is 2000 and tax is 8%, tax amount is 160)
-- Total Amount: Subtotal + Tax Amount
-
-If text is ambiguous or combined (e.g., "Subtotal: $2,000.00 Tax (8%): $160.00 Total: $2,160.00"),
-correctly identify each value based on its label.
-
-Return structured data with confidence scores."""
-
-            response = self.client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                response_model=TotalsExtraction,
-                messages=[
-                    {"role": "system", "content": "You are a financial document extraction expert. Accurately extract subtotal, tax rate, tax amount, and total amount, distinguishing between them carefully."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.0,
-            )
+            response = self._complete(
+                TotalsExtraction, TOTALS_SYSTEM_PROMPT, f"Text sections:\n{relevant_text}")
 
             return response
 
@@ -291,9 +417,7 @@ Return structured data with confidence scores."""
             difference_percent = (difference / subtotal *
                                   100) if subtotal > 0 else 0
 
-            prompt = f"""You are validating financial data extraction accuracy.
-
-Context:
+            prompt = f"""Context:
 - Subtotal: {subtotal}
 - Tax Rate: {tax_rate}%
 - Calculated Tax Amount: {calculated_tax_amount} (subtotal × tax_rate/100)
@@ -301,36 +425,9 @@ Context:
 - Difference: {difference} ({difference_percent:.2f}% of subtotal)
 
 Document Context:
-{document_context}
-
-Question: Is the difference between extracted and calculated tax amounts:
-1. An EXTRACTION ERROR (we picked the wrong number from document)?
-   - Example: Extracted the "Total" amount instead of "Tax" amount
-   - Example: Picked a number from wrong line
-   
-2. A REAL DOCUMENT DISCREPANCY (document has calculation error)?
-   - Example: Document shows wrong tax calculation
-   - Example: Document has typo
-   
-3. ACCEPTABLE ROUNDING (small difference due to rounding)?
-   - Example: Difference < 1% of subtotal
-
-Consider:
-- If extracted amount equals the "Total" line value → extraction error
-- If extracted amount is very close to calculated (±1%) → rounding
-- If extracted amount is very different → likely extraction error (picked wrong number)
-
-Return structured validation result."""
+{document_context}"""
 
-            response = self.client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                response_model=ValidationResult,
-                messages=[
-                    {"role": "system", "content": "You are a financial data validation expert. Distinguish between extraction errors and real document discrepancies."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.0,
-            )
+            response = self._complete(ValidationResult, VALIDATION_SYSTEM_PROMPT, prompt)
 
             return response
 
@@ -13,7 +13,7 @@ from rapidfuzz import fuzz
 from decimal import Decimal
 import json
 
-from src.models.document import Document, DocumentType
+from src.models.document import Document, DocumentType, DocumentStatus
 from src.models.extracted_data import ExtractedData
 from src.models.matching import MatchingResult, DiscrepancyType, DiscrepancySeverity
 
@@ -39,7 +39,7 @@ class MatchingService:
         # Get all processed documents in workspace
         documents = self.db.query(Document).filter(
             Document.workspace_id == workspace_id,
-            Document.status == "PROCESSED"
+            Document.status == DocumentStatus.PROCESSED.value
         ).all()
 
         # Separate by type
@@ -335,10 +335,10 @@ class MatchingService:
             delivery_note_document_id=delivery_note.id if delivery_note else None,
             match_confidence=json.dumps(confidence_scores),
             matched_by=matched_by,
-            total_po_amount=str(po_total),
-            total_invoice_amount=str(invoice_total),
-            total_delivery_amount=str(dn_total) if dn_total else None,
-            total_difference=str(total_difference),
+            total_po_amount=po_total,
+            total_invoice_amount=invoice_total,
+            total_delivery_amount=dn_total if dn_total else None,
+            total_difference=total_difference,
             discrepancies=discrepancies,
         )
 
@@ -44,21 +44,21 @@ class ReportGenerator:
         dn_data = None
 
         if result.po_document_id:
-            po_doc = self.db.query(Document).filter(Document.id == result.po_document_id).first()
+            po_doc = self.db.get(Document, result.po_document_id)
             if po_doc:
                 po_data = self.db.query(ExtractedData).filter(
                     ExtractedData.document_id == po_doc.id
                 ).first()
 
         if result.invoice_document_id:
-            inv_doc = self.db.query(Document).filter(Document.id == result.invoice_document_id).first()
+            inv_doc = self.db.get(Document, result.invoice_document_id)
             if inv_doc:
                 invoice_data = self.db.query(ExtractedData).filter(
                     ExtractedData.document_id == inv_doc.id
                 ).first()
 
         if result.delivery_note_document_id:
-            dn_doc = self.db.query(Document).filter(Document.id == result.delivery_note_document_id).first()
+            dn_doc = self.db.get(Document, result.delivery_note_document_id)
             if dn_doc:
                 dn_data = self.db.query(ExtractedData).filter(
                     ExtractedData.document_id == dn_doc.id
@@ -293,11 +293,11 @@ class ReportGenerator:
         dn_doc = None
 
         if result.po_document_id:
-            po_doc = self.db.query(Document).filter(Document.id == result.po_document_id).first()
+            po_doc = self.db.get(Document, result.po_document_id)
         if result.invoice_document_id:
-            inv_doc = self.db.query(Document).filter(Document.id == result.invoice_document_id).first()
+            inv_doc = self.db.get(Document, result.invoice_document_id)
         if result.delivery_note_document_id:
-            dn_doc = self.db.query(Document).filter(Document.id == result.delivery_note_document_id).first()
+            dn_doc = self.db.get(Document, result.delivery_note_document_id)
 
         # Get extracted data
         po_data = None
@@ -379,12 +379,12 @@ class ReportGenerator:
         inv_data = None
 
         if result.po_document_id:
-            po_doc = self.db.query(Document).filter(Document.id == result.po_document_id).first()
+            po_doc = self.db.get(Document, result.po_document_id)
             if po_doc:
                 po_data = self.db.query(ExtractedData).filter(ExtractedData.document_id == po_doc.id).first()
 
         if result.invoice_document_id:
-            inv_doc = self.db.query(Document).filter(Document.id == result.invoice_document_id).first()
+            inv_doc = self.db.get(Document, result.invoice_document_id)
             if inv_doc:
                 inv_data = self.db.query(ExtractedData).filter(ExtractedData.document_id == inv_doc.id).first()
 
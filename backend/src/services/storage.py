@@ -1,6 +1,6 @@
 import boto3
 from botocore.exceptions import ClientError, EndpointConnectionError
-from typing import BinaryIO, Optional
+from typing import BinaryIO, Iterator, List, Optional
 import io
 import logging
 
@@ -71,17 +71,34 @@ class StorageService:
                 # Don't raise - allow operations to fail gracefully later
 
     def upload_file(self, file_content: bytes, file_path: str, content_type: str = "application/pdf") -> str:
-        """Upload file to storage and return the path"""
+        """Upload file to storage and return the object ETag"""
         self._ensure_bucket_exists()  # Ensure bucket exists before upload
         client = self._get_client()
         try:
-            client.put_object(
+            response = client.put_object(
                 Bucket=self.bucket,
                 Key=file_path,
                 Body=file_content,
                 ContentType=content_type,
             )
-            return file_path
+            return response["ETag"]
+        except (ClientError, EndpointConnectionError) as e:
+            raise Exception(f"Failed to upload file: {str(e)}")
+
+    def upload_stream(self, stream: BinaryIO, file_path: str, content_type: str = "application/pdf", size: Optional[int] = None) -> str:
+        """Upload a file-like object to storage without reading it into memory and return the object ETag"""
+        self._ensure_bucket_exists()
+        client = self._get_client()
+        extra = {"ContentLength": size} if size is not None else {}
+        try:
+            response = client.put_object(
+                Bucket=self.bucket,
+                Key=file_path,
+                Body=stream,
+                ContentType=content_type,
+                **extra,
+            )
+            return response["ETag"]
         except (ClientError, EndpointConnectionError) as e:
             raise Exception(f"Failed to upload file: {str(e)}")
 
@@ -94,6 +111,22 @@ class StorageService:
         except (ClientError, EndpointConnectionError) as e:
             raise Exception(f"Failed to get file: {str(e)}")
 
+    def get_file_stream(self, file_path: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Stream file from storage in chunks without buffering the whole object"""
+        client = self._get_client()
+        try:
+            body = client.get_object(Bucket=self.bucket, Key=file_path)["Body"]
+        except (ClientError, EndpointConnectionError) as e:
+            raise Exception(f"Failed to get file: {str(e)}")
+        return self._iter_body(body, chunk_size)
+
+    @staticmethod
+    def _iter_body(body, chunk_size: int) -> Iterator[bytes]:
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
     def delete_file(self, file_path: str):
         """Delete file from storage"""
         try:
@@ -109,6 +142,48 @@ class StorageService:
                 return
             raise Exception(f"Failed to delete file: {str(e)}")
 
+    def delete_files(self, file_paths: List[str]) -> List[str]:
+        """Delete files with S3 multi-object deletes and return per-file error messages"""
+        errors = []
+        if not file_paths:
+            return errors
+        client = self._get_client()
+        # DeleteObjects accepts at most 1000 keys per request
+        for start in range(0, len(file_paths), 1000):
+            batch = file_paths[start:start + 1000]
+            try:
+                response = client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": path} for path in batch], "Quiet": True},
+                )
+            except (ClientError, EndpointConnectionError) as e:
+                # Storage being unavailable must not block DB cleanup, so report instead of raising
+                logger.warning(f"Bulk file deletion failed for {len(batch)} files: {str(e)}")
+                errors.extend(f"Failed to delete file {path}: {str(e)}" for path in batch)
+                continue
+            # Already-missing files are not failures, same as delete_file
+            errors.extend(
+                f"Failed to delete file {error.get('Key')}: {error.get('Message')}"
+                for error in response.get("Errors", [])
+                if error.get("Code") != "NoSuchKey"
+            )
+        return errors
+
+    def delete_prefix(self, prefix: str) -> List[str]:
+        """Delete every object under a prefix and return per-file error messages"""
+        errors = []
+        client = self._get_client()
+        try:
+            # Each listing page holds at most 1000 keys, i.e. exactly one DeleteObjects request
+            paginator = client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+                keys = [obj["Key"] for obj in page.get("Contents", [])]
+                errors.extend(self.delete_files(keys))
+        except (ClientError, EndpointConnectionError) as e:
+            logger.warning(f"Failed to list files under {prefix}: {str(e)}")
+            errors.append(f"Failed to list files under {prefix}: {str(e)}")
+        return errors
+
     def file_exists(self, file_path: str) -> bool:
         """Check if file exists in storage"""
         try:
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import delete
+from starlette.concurrency import run_in_threadpool
+
+from src.core.database import SessionLocal
+from src.models.workspace import Workspace
+
+logger = logging.getLogger(__name__)
+
+
+class WorkspaceDeleteBatcher:
+    """Coalesces concurrent workspace deletions into a single transaction"""
+
+    def __init__(self, max_batch_size: int = 25):
+        self.max_batch_size = max_batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the background worker (called from the app lifespan)"""
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background worker"""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def delete(self, workspace_id: str) -> bool:
+        """Queue a workspace for deletion and wait until its batch is committed"""
+        if self._worker is None:
+            # Worker not running (e.g. scripts), delete directly
+            deleted = await run_in_threadpool(self._delete_batch, [workspace_id])
+            return workspace_id in deleted
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((workspace_id, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            # A lone request is deleted immediately; requests that arrive while a
+            # batch is being committed are drained together into the next one
+            batch: List[Tuple[str, asyncio.Future]] = [await self._queue.get()]
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            workspace_ids = [workspace_id for workspace_id, _ in batch]
+            try:
+                deleted = await run_in_threadpool(self._delete_batch, workspace_ids)
+            except Exception as e:
+                logger.error(f"Failed to delete workspaces {workspace_ids}: {str(e)}", exc_info=True)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for workspace_id, future in batch:
+                if not future.done():
+                    future.set_result(workspace_id in deleted)
+
+    @staticmethod
+    def _delete_batch(workspace_ids: List[str]) -> Set[str]:
+        """Delete workspaces in one transaction; children go through ON DELETE CASCADE"""
+        db = SessionLocal()
+        try:
+            deleted = db.scalars(
+                delete(Workspace).where(Workspace.id.in_(workspace_ids)).returning(Workspace.id)
+            ).all()
+            db.commit()
+            return set(deleted)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+workspace_delete_batcher = WorkspaceDeleteBatcher()
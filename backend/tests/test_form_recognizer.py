@@ -0,0 +1,222 @@
+from types import SimpleNamespace
+import ast
+import inspect
+
+import pytest
+
+from src.models.document import DocumentType
+from src.services import form_recognizer
+from src.services.form_recognizer import FormRecognizerService
+
+PDF_CONTENT = b"%PDF-1.4 test invoice"
+PNG_CONTENT = b"\x89PNG\r\n\x1a\n scanned invoice"
+
+
+def _field(value, confidence=0.95):
+    return SimpleNamespace(value=value, confidence=confidence)
+
+
+def _money(amount, currency_code="USD"):
+    return SimpleNamespace(amount=amount, currency_code=currency_code)
+
+
+class _Poller:
+    def __init__(self, result):
+        self._result = result
+
+    def result(self):
+        return self._result
+
+
+class _FakeClient:
+    """Stands in for DocumentAnalysisClient and records the models it was asked for"""
+
+    def __init__(self, result):
+        self._result = result
+        self.model_ids = []
+
+    def begin_analyze_document(self, model_id, document):
+        self.model_ids.append(model_id)
+        return _Poller(self._result)
+
+
+def _invoice_result(**overrides):
+    fields = {
+        "InvoiceId": _field("INV-1001"),
+        "CustomerPurchaseOrder": _field("PO-2001"),
+        "VendorName": _field("Acme Supplies"),
+        "VendorAddress": _field(SimpleNamespace(
+            street_address="1 Main St", city="Springfield", state="IL", postal_code="62701",
+        )),
+        "SubTotal": _field(_money(100.0)),
+        "Tax": _field(_money(10.0)),
+        "AmountDue": _field(_money(110.0)),
+        "Items": _field([
+            _field({
+                "ProductCode": _field("A-1"),
+                "Description": _field("Widget"),
+                "Quantity": _field(2.0),
+                "UnitPrice": _field(_money(50.0)),
+                "Amount": _field(_money(100.0)),
+            }),
+        ]),
+    }
+    fields.update(overrides)
+    fields = {name: field for name, field in fields.items() if field is not None}
+    return SimpleNamespace(
+        documents=[SimpleNamespace(fields=fields)],
+        paragraphs=[],
+        pages=[],
+        tables=[],
+        content="INVOICE INV-1001",
+    )
+
+
+@pytest.fixture
+def service():
+    return FormRecognizerService()
+
+
+def test_analyze_invoice_extracts_fields_from_azure_result(service):
+    service.client = _FakeClient(_invoice_result())
+
+    extracted = service.analyze_invoice(PDF_CONTENT)
+
+    assert service.client.model_ids == ["prebuilt-invoice"]
+    assert extracted["invoice_number"] == "INV-1001"
+    assert extracted["po_number"] == "PO-2001"
+    assert extracted["vendor_name"] == "Acme Supplies"
+    assert extracted["total_amount"] == 110.0
+    assert extracted["subtotal"] == 100.0
+    assert extracted["tax_amount"] == 10.0
+    assert extracted["tax_rate"] == pytest.approx(10.0)
+    assert extracted["currency_code"] == "USD"
+    assert extracted["confidence_scores"]["invoice_number"] == 0.95
+    assert extracted["line_items"] == [{
+        "item_number": "A-1",
+        "description": "Widget",
+        "quantity": 2.0,
+        "unit_price": 50.0,
+        "line_total": 100.0,
+    }]
+
+
+def test_vendor_address_is_read_from_address_value_attributes(service):
+    # Azure returns an AddressValue object; it has no dict-style .get()
+    address = SimpleNamespace(
+        street_address="1 Main St", city="Springfield", state=None, postal_code="62701",
+    )
+    service.client = _FakeClient(_invoice_result(VendorAddress=_field(address, confidence=0.8)))
+
+    extracted = service.analyze_invoice(PDF_CONTENT)
+
+    assert extracted["vendor_address"] == "1 Main St, Springfield, 62701"
+    assert extracted["confidence_scores"]["vendor_address"] == 0.8
+
+
+def test_module_defines_a_single_service():
+    tree = ast.parse(inspect.getsource(form_recognizer))
+    classes = [node.name for node in tree.body if isinstance(node, ast.ClassDef)]
+
+    assert classes.count("FormRecognizerService") == 1
+    assert form_recognizer.get_form_recognizer_service() is form_recognizer.get_form_recognizer_service()
+
+
+def _fail_llm_request(*args, **kwargs):
+    raise AssertionError("unexpected LLM request")
+
+
+def test_clean_invoice_makes_no_llm_request(service):
+    # Currency comes from the AmountDue CurrencyValue and there is no tax to validate
+    service.client = _FakeClient(_invoice_result(Tax=None))
+    service.llm_extractor.enabled = True
+    service.llm_extractor.extract_all = _fail_llm_request
+
+    extracted = service.analyze_invoice(PDF_CONTENT)
+
+    assert extracted["currency_code"] == "USD"
+    assert extracted["tax_amount"] is None
+
+
+def test_invoice_with_consistent_azure_tax_rate_makes_no_llm_request(service):
+    # 10.0 / 100.0 matches Azure's 10% TaxRate, so there is nothing for the LLM to decide
+    service.client = _FakeClient(_invoice_result(TaxRate=_field(0.10)))
+    service.llm_extractor.enabled = True
+    service.llm_extractor.extract_all = _fail_llm_request
+
+    extracted = service.analyze_invoice(PDF_CONTENT)
+
+    assert extracted["tax_amount"] == 10.0
+    assert extracted["tax_rate"] == pytest.approx(10.0)
+
+
+def test_identical_content_is_analyzed_once(service):
+    service.client = _FakeClient(_invoice_result())
+
+    first = service.extract_document(DocumentType.INVOICE, PDF_CONTENT)
+    first["invoice_number"] = "changed by caller"
+    second = service.extract_document(DocumentType.INVOICE, PDF_CONTENT)
+
+    assert service.client.model_ids == ["prebuilt-invoice"]
+    assert second["invoice_number"] == "INV-1001"
+
+
+def test_failed_analysis_is_not_cached(service):
+    service.client = _FakeClient(_invoice_result())
+
+    def _fail_once(*args, **kwargs):
+        service._extract_document = original
+        raise RuntimeError("Azure unavailable")
+
+    original = service._extract_document
+    service._extract_document = _fail_once
+    with pytest.raises(RuntimeError):
+        service.extract_document(DocumentType.INVOICE, PDF_CONTENT)
+
+    assert service.extract_document(DocumentType.INVOICE, PDF_CONTENT)["invoice_number"] == "INV-1001"
+
+
+def test_untyped_scanned_invoice_is_analyzed_once(service):
+    # No PDF text layer to classify locally, so the invoice model result decides the type
+    service.client = _FakeClient(_invoice_result())
+
+    document_type, extracted = service.extract_document_auto(PNG_CONTENT)
+
+    assert document_type == DocumentType.INVOICE
+    assert service.client.model_ids == ["prebuilt-invoice"]
+    assert extracted["invoice_number"] == "INV-1001"
+
+
+def test_untyped_scanned_purchase_order_is_analyzed_once(service):
+    # The invoice model result also carries the page text and tables the PO parser reads
+    result = _invoice_result()
+    result.content = "PURCHASE ORDER PO-2001"
+    service.client = _FakeClient(result)
+
+    document_type, _ = service.extract_document_auto(PNG_CONTENT)
+
+    assert document_type == DocumentType.PURCHASE_ORDER
+    assert service.client.model_ids == ["prebuilt-invoice"]
+
+
+def test_untyped_reupload_reuses_the_previous_extraction(service):
+    service.client = _FakeClient(_invoice_result())
+
+    service.extract_document_auto(PNG_CONTENT)
+    document_type, extracted = service.extract_document_auto(PNG_CONTENT)
+    typed = service.extract_document(DocumentType.INVOICE, PNG_CONTENT)
+
+    assert service.client.model_ids == ["prebuilt-invoice"]
+    assert document_type == DocumentType.INVOICE
+    assert extracted["invoice_number"] == typed["invoice_number"] == "INV-1001"
+
+
+def test_untyped_upload_uses_a_persisted_extraction(service):
+    service.client = _FakeClient(_invoice_result())
+    previous = (DocumentType.DELIVERY_NOTE, {"delivery_note_number": "DN-1"})
+
+    document_type, extracted = service.extract_document_auto(PNG_CONTENT, load_previous=lambda: previous)
+
+    assert service.client.model_ids == []
+    assert document_type == DocumentType.DELIVERY_NOTE
+    assert extracted == {"delivery_note_number": "DN-1"}